@@ -2,57 +2,478 @@
 """
 Production build script for Financial Analyzer web application.
 Builds the React frontend and configures FastAPI to serve it.
+
+Run with --daemon to keep a watching build alive between invocations.
+
+Set FRONTEND_ARTIFACT_URL to a base URL serving `<commit sha>/dist.tar.gz`
+archives of frontend/dist to skip bun entirely for clean, prebuilt commits.
 """
 
+import asyncio
+import hashlib
+import shutil
 import subprocess
 import sys
 import os
-from pathlib import Path
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Iterator, List, Optional
 
-def main():
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+FRONTEND_DIR = os.path.join(PROJECT_ROOT, "frontend")
+DIST_DIR = os.path.join(FRONTEND_DIR, "dist")
+
+LOCKFILES = ("package.json", "bun.lock", "bun.lockb")
+SOURCE_DIRS = ("src", "public")
+SOURCE_FILES = ("package.json", "index.html", "vite.config.ts", "vite.config.js")
+REQUIRED_DIST_ENTRIES = {"index.html", "assets"}
+PRECOMPRESS_SUFFIXES = (".js", ".css", ".html", ".svg")
+MAX_BUILD_WORKERS = 6
+
+INSTALL_STAMP = os.path.join(FRONTEND_DIR, "node_modules", ".install-stamp")
+DAEMON_PIDFILE = os.path.join(FRONTEND_DIR, "node_modules", ".build-daemon.pid")
+BUILD_MANIFEST = os.path.join(DIST_DIR, ".build-manifest")
+
+BANNER = "\n".join([
+    "🏗️  Building Financial Analyzer for Production...",
+    "=" * 50,
+    "⚛️  Building React frontend...",
+]) + "\n"
+MSG_PREBUILT = "📥 Using prebuilt frontend for this commit\n"
+MSG_DEPS_CURRENT = "⏭  Frontend dependencies up to date\n"
+MSG_INSTALLING = "📦 Installing frontend dependencies...\n"
+MSG_DAEMON_RUNNING = "⏭  Build daemon is running; it rebuilds on every source change\n"
+MSG_UP_TO_DATE = "⏭  Frontend up to date\n"
+MSG_BUILDING = "🔨 Building frontend...\n"
+MSG_PRECOMPRESSING = "🗜️  Precompressing assets...\n"
+FOOTER = "\n".join([
+    "✅ Frontend built successfully!",
+    f"📁 Build output: {DIST_DIR}",
+    "",
+    "🚀 To run the production server:",
+    "   python -m uvicorn web_api:app --host 0.0.0.0 --port 8000",
+    "   Then visit: http://localhost:8000",
+    "=" * 50,
+]) + "\n"
+
+# Base URL for prebuilt dist archives, keyed by commit sha
+ARTIFACT_BASE = os.environ.get("FRONTEND_ARTIFACT_URL", "").rstrip("/")
+
+# Resolve bun once instead of letting every subprocess search PATH. Spawning an absolute path with
+# close_fds=False and no cwd= lets subprocess use posix_spawn instead of fork+exec, so the working
+# directory is passed to bun as --cwd rather than to Popen.
+BUN = shutil.which("bun") or "bun"
+
+# Shared package store so every checkout hardlinks the same downloaded deps
+BUN_CACHE_DIR = os.environ.get("BUN_INSTALL_CACHE_DIR") or os.path.expanduser("~/.cache/bun-shared")
+
+# Reused across builds and asset compression when a watch driver imports this module
+_build_pool: Optional[ProcessPoolExecutor] = None
+
+def _fail(message: str) -> int:
+    """Report a build failure on stderr and return the exit code."""
+    sys.stdout.flush()
+    sys.stderr.write(f"❌ {message}\n")
+    return 1
+
+def _read_marker(path: str) -> Optional[str]:
+    """Read a stamp/manifest file, returning None when it doesn't exist."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+def _remove_marker(path: str) -> None:
+    """Delete a stamp/manifest file if it exists."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def _dependency_digest(frontend_dir: str) -> str:
+    """Hash package.json and the bun lockfile to detect dependency changes."""
+    digest = hashlib.blake2b()
+    for name in LOCKFILES:
+        try:
+            with open(os.path.join(frontend_dir, name), "rb") as f:
+                digest.update(f.read())
+        except FileNotFoundError:
+            continue
+    return digest.hexdigest()
+
+def _walk_sources(root: str, frontend_dir: str, digest) -> None:
+    """Feed (path, mtime, size) of every file under root into the digest."""
+    try:
+        entries = sorted(os.scandir(root), key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            _walk_sources(entry.path, frontend_dir, digest)
+        elif entry.is_file():
+            st = entry.stat()
+            rel = os.path.relpath(entry.path, frontend_dir)
+            digest.update(f"{rel}:{st.st_mtime_ns}:{st.st_size}\n".encode())
+
+def _source_fingerprint(frontend_dir: str) -> str:
+    """Fingerprint the frontend sources so unchanged trees can skip the build."""
+    digest = hashlib.blake2b()
+    for name in SOURCE_DIRS:
+        _walk_sources(os.path.join(frontend_dir, name), frontend_dir, digest)
+    for name in SOURCE_FILES:
+        try:
+            st = os.stat(os.path.join(frontend_dir, name))
+        except FileNotFoundError:
+            continue
+        digest.update(f"{name}:{st.st_mtime_ns}:{st.st_size}\n".encode())
+    return digest.hexdigest()
+
+def _write_atomic(path: str, content: str) -> None:
+    """Write content to path via a temp file so readers never see a partial write."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def _workspace_dirs(frontend_dir: str) -> List[str]:
+    """Resolve the workspace packages declared in the frontend package.json."""
+    import glob
+    import json
+    
+    try:
+        with open(os.path.join(frontend_dir, "package.json"), encoding="utf-8") as f:
+            workspaces = json.load(f).get("workspaces", [])
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+    if isinstance(workspaces, dict):
+        workspaces = workspaces.get("packages", [])
+    dirs = []
+    for pattern in workspaces:
+        matches = sorted(glob.glob(os.path.join(frontend_dir, pattern)))
+        dirs.extend(d for d in matches if os.path.isfile(os.path.join(d, "package.json")))
+    return dirs
+
+def _build_levels(package_dirs: List[str]) -> List[List[str]]:
+    """Group workspace packages so each group only depends on packages in earlier groups."""
+    import json
+    
+    names = {}
+    requires = {}
+    for package_dir in package_dirs:
+        try:
+            with open(os.path.join(package_dir, "package.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except json.JSONDecodeError:
+            manifest = {}
+        names[manifest.get("name", package_dir)] = package_dir
+        requires[package_dir] = {
+            name
+            for field in ("dependencies", "devDependencies", "peerDependencies", "optionalDependencies")
+            for name in manifest.get(field) or {}
+        }
+    remaining = {
+        package_dir: {names[name] for name in deps if name in names and names[name] != package_dir}
+        for package_dir, deps in requires.items()
+    }
+    
+    levels = []
+    while remaining:
+        ready = sorted(d for d, deps in remaining.items() if not deps)
+        if not ready:
+            # Dependency cycle: build what is left one package at a time
+            levels.extend([d] for d in sorted(remaining))
+            break
+        levels.append(ready)
+        for package_dir in ready:
+            del remaining[package_dir]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return levels
+
+def _get_build_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool used for workspace builds."""
+    global _build_pool
+    if _build_pool is None:
+        _build_pool = ProcessPoolExecutor(max_workers=min(MAX_BUILD_WORKERS, os.cpu_count() or 1))
+    return _build_pool
+
+def _in_thread(func, *args) -> "asyncio.Future":
+    """Run a blocking call on the default executor (asyncio.to_thread needs Python 3.9)."""
+    return asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+def _relay_output(stream: IO[bytes]) -> None:
+    """Copy a subprocess's output to our stdout line by line."""
+    # Relay bytes untouched: bun prints emoji and box drawing, and a decode or encode error under a
+    # non-UTF-8 locale would kill this thread, leaving the pipe undrained and the build blocked
+    out = getattr(sys.stdout, "buffer", None)
+    for line in stream:
+        sys.stdout.flush()
+        if out is not None:
+            out.write(line)
+        else:
+            sys.stdout.write(line.decode("utf-8", errors="replace"))
+
+def _build_one(package_dir: str) -> None:
+    """Build a single workspace package, raising CalledProcessError on failure."""
+    proc = subprocess.Popen(
+        [BUN, "run", f"--cwd={package_dir}", "build"],
+        close_fds=False,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    relay = threading.Thread(target=_relay_output, args=(proc.stdout,), daemon=True)
+    relay.start()
+    returncode = proc.wait()
+    relay.join()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, proc.args)
+
+async def _build_frontend(frontend_dir: str) -> None:
+    """Build the frontend, fanning independent workspace packages out across processes."""
+    root = os.path.realpath(frontend_dir)
+    workspace_dirs = [d for d in _workspace_dirs(frontend_dir) if os.path.realpath(d) != root]
+    
+    # Packages build in dependency order; only those within one level run in parallel
+    loop = asyncio.get_running_loop()
+    for level in _build_levels(workspace_dirs):
+        if len(level) == 1:
+            await _in_thread(_build_one, level[0])
+        else:
+            pool = _get_build_pool()
+            await asyncio.gather(*(loop.run_in_executor(pool, _build_one, d) for d in level))
+    
+    # The root app bundles the workspace packages into dist, so it builds last
+    await _in_thread(_build_one, frontend_dir)
+
+def _iter_files(root: str) -> Iterator[str]:
+    """Yield every regular file under root."""
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from _iter_files(entry.path)
+        elif entry.is_file():
+            yield entry.path
+
+def _prefetch_sources(frontend_dir: str) -> None:
+    """Ask the kernel to start reading frontend sources before the bundler needs them."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for name in SOURCE_DIRS:
+        for path in _iter_files(os.path.join(frontend_dir, name)):
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+
+def _precompress_one(path: str) -> None:
+    """Write .gz (and .br when brotli is installed) siblings next to an asset."""
+    import gzip
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+
+async def _precompress_assets(dist_dir: str) -> None:
+    """Compress built assets across the process pool so requests don't pay for it."""
+    loop = asyncio.get_running_loop()
+    pool = _get_build_pool()
+    assets = [p for p in _iter_files(dist_dir) if p.endswith(PRECOMPRESS_SUFFIXES)]
+    await asyncio.gather(*(loop.run_in_executor(pool, _precompress_one, p) for p in assets))
+
+def _process_command(pid: int) -> Optional[str]:
+    """Return the command line of a running process, or None if it can't be found."""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().replace(b"\0", b" ").decode(errors="replace").strip() or None
+    except FileNotFoundError:
+        if os.path.isdir("/proc"):
+            return None
+    except OSError:
+        return None
+    # No procfs (macOS, BSD): ask ps instead
+    try:
+        return subprocess.check_output(
+            ["ps", "-o", "command=", "-p", str(pid)], text=True, stderr=subprocess.DEVNULL
+        ).strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _daemon_running() -> bool:
+    """Check whether the pidfile points at a live build daemon from --daemon, not a reused pid."""
+    try:
+        pid = int(_read_marker(DAEMON_PIDFILE) or "")
+    except ValueError:
+        return False
+    command = _process_command(pid)
+    return command is not None and "build" in command and "--watch" in command
+
+def _run_build_daemon(frontend_dir: str) -> int:
+    """Keep vite's watch build alive so rebuilds skip bun's cold start."""
+    proc = subprocess.Popen([BUN, "run", f"--cwd={frontend_dir}", "build", "--watch"], close_fds=False)
+    _write_atomic(DAEMON_PIDFILE, str(proc.pid))
+    print(f"👀 Build daemon watching frontend sources (pid {proc.pid})")
+    print("🔧 Press Ctrl+C to stop")
+    sys.stdout.flush()
+    try:
+        return proc.wait()
+    except KeyboardInterrupt:
+        proc.terminate()
+        proc.wait()
+        return 0
+    finally:
+        try:
+            os.unlink(DAEMON_PIDFILE)
+        except FileNotFoundError:
+            pass
+
+def _checked_members(archive, dest: str) -> Iterator:
+    """Yield archive members, refusing anything but plain files and directories inside dest."""
+    import tarfile
+    
+    root = os.path.realpath(dest)
+    for member in archive:
+        target = os.path.realpath(os.path.join(root, member.name))
+        if not (member.isfile() or member.isdir()) or os.path.commonpath([root, target]) != root:
+            raise tarfile.TarError(f"Refusing to extract {member.name!r} from the prebuilt archive")
+        yield member
+
+def _fetch_prebuilt_dist() -> bool:
+    """Download and unpack the prebuilt dist archive for HEAD, if one exists."""
+    import tarfile
+    import urllib.request
+    
+    download_dir = DIST_DIR + ".download"
+    # A previous interrupted download must not leak stale files into dist
+    shutil.rmtree(download_dir, ignore_errors=True)
+    try:
+        dirty = subprocess.check_output(
+            ["git", "status", "--porcelain", "--", "frontend"], cwd=PROJECT_ROOT, text=True
+        )
+        if dirty.strip():
+            return False
+        sha = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT, text=True).strip()
+        
+        extract_args = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+        with urllib.request.urlopen(f"{ARTIFACT_BASE}/{sha}/dist.tar.gz", timeout=30) as response:
+            with tarfile.open(fileobj=response, mode="r|gz") as archive:
+                archive.extractall(download_dir, members=_checked_members(archive, download_dir), **extract_args)
+        
+        shutil.rmtree(DIST_DIR, ignore_errors=True)
+        os.replace(download_dir, DIST_DIR)
+        return True
+    except (OSError, subprocess.CalledProcessError, tarfile.TarError):
+        shutil.rmtree(download_dir, ignore_errors=True)
+        return False
+
+def _compile_backend(project_root: str) -> bool:
+    """Byte-compile the FastAPI backend so the first server start skips it."""
+    import compileall
+    
+    ok = compileall.compile_dir(os.path.join(project_root, "finanalyser_mcp"), quiet=1)
+    ok = compileall.compile_file(os.path.join(project_root, "web_api.py"), quiet=1) and ok
+    return bool(ok)
+
+async def _finish_build(fingerprint: str) -> int:
+    """Verify and precompress the dist output, then record the sources it was built from."""
+    # Check the build output in a single directory listing
+    try:
+        entries = {entry.name for entry in os.scandir(DIST_DIR)}
+    except FileNotFoundError:
+        return _fail("Build output directory not found!")
+    missing = REQUIRED_DIST_ENTRIES - entries
+    if missing:
+        return _fail(f"Build output is missing: {', '.join(sorted(missing))}")
+    
+    sys.stdout.write(MSG_PRECOMPRESSING)
+    await _precompress_assets(DIST_DIR)
+    
+    _write_atomic(BUILD_MANIFEST, fingerprint)
+    
+    sys.stdout.write(FOOTER)
+    
+    return 0
+
+async def main_async(daemon: bool = False):
     """Build the React frontend for production."""
     
-    # Change to project root
-    project_root = Path(__file__).parent
-    os.chdir(project_root)
+    sys.stdout.write(BANNER)
+    
+    if not os.path.isdir(FRONTEND_DIR):
+        return _fail("Frontend directory not found!")
     
-    print("🏗️  Building Financial Analyzer for Production...")
-    print("=" * 50)
+    # Skip everything when dist was already built from these exact sources
+    fingerprint = _source_fingerprint(FRONTEND_DIR)
+    if not daemon and _read_marker(BUILD_MANIFEST) == fingerprint:
+        await _in_thread(_compile_backend, PROJECT_ROOT)
+        sys.stdout.write(MSG_UP_TO_DATE)
+        return 0
     
-    # Build React frontend
-    print("⚛️  Building React frontend...")
-    frontend_dir = project_root / "frontend"
+    if not daemon and ARTIFACT_BASE and await _in_thread(_fetch_prebuilt_dist):
+        sys.stdout.write(MSG_PREBUILT)
+        await _in_thread(_compile_backend, PROJECT_ROOT)
+        return await _finish_build(fingerprint)
     
-    if not frontend_dir.exists():
-        print("❌ Frontend directory not found!")
-        return 1
+    # Install dependencies if needed, compiling the backend while bun runs
+    digest = _dependency_digest(FRONTEND_DIR)
+    compile_backend = _in_thread(_compile_backend, PROJECT_ROOT)
+    if _read_marker(INSTALL_STAMP) == digest:
+        sys.stdout.write(MSG_DEPS_CURRENT)
+        await compile_backend
+    else:
+        sys.stdout.write(MSG_INSTALLING)
+        sys.stdout.flush()
+        os.makedirs(BUN_CACHE_DIR, exist_ok=True)
+        install_cmd = [BUN, "install", f"--cwd={FRONTEND_DIR}", "--backend=hardlink"]
+        install = await asyncio.create_subprocess_exec(
+            *install_cmd,
+            env={**os.environ, "BUN_INSTALL_CACHE_DIR": BUN_CACHE_DIR},
+            close_fds=False,
+        )
+        await asyncio.gather(install.wait(), compile_backend)
+        if install.returncode != 0:
+            raise subprocess.CalledProcessError(install.returncode, install_cmd)
+        _write_atomic(INSTALL_STAMP, digest)
     
-    # Install dependencies if needed
-    print("📦 Installing frontend dependencies...")
-    subprocess.run(["bun", "install"], cwd=frontend_dir, check=True)
+    if daemon:
+        return _run_build_daemon(FRONTEND_DIR)
+    if _daemon_running():
+        # The watcher rewrites dist on every change, so precompressed siblings would go stale behind it;
+        # dropping the manifest makes the first run after the daemon stops do a full, precompressed build
+        sys.stdout.write(MSG_DAEMON_RUNNING)
+        _remove_marker(BUILD_MANIFEST)
+        return 0
     
     # Build the frontend
-    print("🔨 Building frontend...")
-    result = subprocess.run(["bun", "run", "build"], cwd=frontend_dir)
-    
-    if result.returncode != 0:
-        print("❌ Frontend build failed!")
-        return 1
-    
-    # Check if dist directory was created
-    dist_dir = frontend_dir / "dist"
-    if not dist_dir.exists():
-        print("❌ Build output directory not found!")
-        return 1
-    
-    print("✅ Frontend built successfully!")
-    print(f"📁 Build output: {dist_dir}")
-    print("\n🚀 To run the production server:")
-    print("   python -m uvicorn web_api:app --host 0.0.0.0 --port 8000")
-    print("   Then visit: http://localhost:8000")
-    print("=" * 50)
+    sys.stdout.write(MSG_BUILDING)
+    threading.Thread(target=_prefetch_sources, args=(FRONTEND_DIR,), daemon=True).start()
+    await _build_frontend(FRONTEND_DIR)
     
-    return 0
+    return await _finish_build(fingerprint)
+
+def main():
+    """Entry point wrapping the async build driver."""
+    try:
+        return asyncio.run(main_async(daemon="--daemon" in sys.argv[1:]))
+    except subprocess.CalledProcessError as e:
+        return _fail(f"{' '.join(e.cmd)} failed (exit {e.returncode})")
+    finally:
+        sys.stdout.flush()
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
@@ -1,16 +1,31 @@
 #!/usr/bin/env python3
 
 import asyncio
+import heapq
+import io
 import json
 import csv
+import hashlib
+import operator
 import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from functools import lru_cache
+from itertools import chain
+from typing import AsyncIterator, Awaitable, BinaryIO, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Any, Tuple
+from dataclasses import dataclass
 from pathlib import Path
 import logging
 
 import openai
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 from mcp.server import Server
 from mcp.server.models import InitializationOptions, ServerCapabilities
 from mcp.server.lowlevel.server import NotificationOptions
@@ -25,11 +40,138 @@ from mcp.types import (
 )
 from pydantic import BaseModel
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import pyarrow
+    import pyarrow.csv as pyarrow_csv
+except ImportError:
+    pyarrow = None
+    pyarrow_csv = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Accepted spellings of each CSV column, in lookup order
+CSV_COLUMN_VARIANTS = {
+    "date": ("date", "Date", "DATE"),
+    "description": ("description", "Description", "DESCRIPTION"),
+    "amount": ("amount", "Amount", "AMOUNT"),
+}
+
+# Thousands separators, spaces and currency symbols stripped from amount cells
+_AMOUNT_STRIP_TABLE = str.maketrans("", "", ",$₹€£ ")
+
+_NON_WORD_RE = re.compile(r"\W+")
+_TRAILING_REFERENCE_RE = re.compile(r"(?: \d+)+$")
+_ISO_DATE_RE = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}\Z")
+_CODE_FENCE_RE = re.compile(r"\A```(?:json)?|```\Z")
+
+# Shape every LLM suggestion must have to be shown to the user
+_SUGGESTION_REQUIRED_KEYS = frozenset({"id", "title", "description", "category", "impact"})
+_SUGGESTION_CATEGORIES = frozenset({"savings", "spending", "budget", "investment"})
+_SUGGESTION_IMPACTS = frozenset({"high", "medium", "low"})
+
+# Reused stdlib encoders; json.dumps builds a fresh JSONEncoder whenever options are passed
+_JSON_COMPACT_ENCODER = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+_JSON_PRETTY_ENCODER = json.JSONEncoder(indent=2, ensure_ascii=False)
+
+def json_dumps(obj: Any, pretty: bool = False) -> str:
+    """Serialize to JSON text, using orjson when it is installed."""
+    if orjson is not None:
+        # OPT_NON_STR_KEYS matches the stdlib's handling of int/float/bool/None keys
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, option=option).decode()
+    return (_JSON_PRETTY_ENCODER if pretty else _JSON_COMPACT_ENCODER).encode(obj)
+
+def json_dumps_bytes(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes, skipping the str round-trip when orjson is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return _JSON_COMPACT_ENCODER.encode(obj).encode("utf-8")
+
+def json_loads(data: Any) -> Any:
+    """Parse JSON text or bytes, using orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson is strict RFC 8259; the stdlib also accepts NaN/Infinity literals
+            pass
+    return json.loads(data)
+
+# LLM outputs replaced by fallbacks in the current request; tasks share the list through their copied context
+_LLM_FALLBACKS: "ContextVar[Optional[List[str]]]" = ContextVar("llm_fallbacks", default=None)
+
+@contextmanager
+def track_llm_fallbacks() -> Iterator[List[str]]:
+    """Collect a note for each LLM result replaced by a fallback while the context is active."""
+    fallbacks: List[str] = []
+    token = _LLM_FALLBACKS.set(fallbacks)
+    try:
+        yield fallbacks
+    finally:
+        try:
+            _LLM_FALLBACKS.reset(token)
+        except ValueError:
+            # An async generator finalized from another context; that context never saw the value
+            pass
+
+def _note_llm_fallback(reason: str) -> None:
+    fallbacks = _LLM_FALLBACKS.get()
+    if fallbacks is not None:
+        fallbacks.append(reason)
+
+def _is_valid_suggestion(suggestion: Any) -> bool:
+    """Check a parsed suggestion against the required keys and allowed enum values."""
+    if not isinstance(suggestion, dict) or not _SUGGESTION_REQUIRED_KEYS <= suggestion.keys():
+        return False
+    category, impact = suggestion["category"], suggestion["impact"]
+    return (isinstance(category, str) and category in _SUGGESTION_CATEGORIES
+            and isinstance(impact, str) and impact in _SUGGESTION_IMPACTS)
+
+def _normalize_description(description: str) -> str:
+    """Lowercase a description and strip punctuation and trailing reference numbers."""
+    normalized = _NON_WORD_RE.sub(" ", description.lower()).strip()
+    return _TRAILING_REFERENCE_RE.sub("", normalized)
+
+@lru_cache(maxsize=4096)
+def _date_to_month(date: str) -> str:
+    """Map a YYYY-MM-DD date to its YYYY-MM month (statements repeat dates, so this is memoized)."""
+    if _ISO_DATE_RE.match(date):
+        # Valid or not, a strict ISO date maps to its first seven characters; skip strptime
+        return date[:7]
+    try:
+        return datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m')
+    except (TypeError, ValueError):
+        return date[:7] if len(date) >= 7 else "Unknown"
+
+def _build_keyword_automaton(keywords: Iterable[str]) -> Any:
+    """Compile keywords into an Aho-Corasick automaton when pyahocorasick is installed."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+# Slotted dataclasses need Python 3.10+
+@dataclass(**({"slots": True} if sys.version_info >= (3, 10) else {}))
 class Transaction:
     date: str
     description: str
@@ -38,9 +180,330 @@ class Transaction:
     type: Optional[str] = None  # 'income' or 'expense'
     confidence: Optional[float] = None
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat dict of the transaction fields (cheaper than dataclasses.asdict)."""
+        return {
+            "date": self.date,
+            "description": self.description,
+            "amount": self.amount,
+            "category": self.category,
+            "type": self.type,
+            "confidence": self.confidence
+        }
+
+# Characters that can change string or object nesting state in streamed JSON
+_JSON_STRUCTURE_RE = re.compile(r'[{}"\\]')
+
+class StreamingObjectParser:
+    """Incrementally extract complete flat JSON objects from a streamed LLM response."""
+
+    def __init__(self):
+        self._buffer = ""
+        # Offsets of unclosed "{" in the buffer; negative once trimmed away
+        self._starts: List[int] = []
+        self._in_string = False
+        self._escaped_at = -1
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of text, returning any categorization objects it completed."""
+        objects = []
+        offset = len(self._buffer)
+        self._buffer += text
+        for match in _JSON_STRUCTURE_RE.finditer(self._buffer, offset):
+            i = match.start()
+            ch = match.group()
+            if self._in_string:
+                if i == self._escaped_at:
+                    continue
+                if ch == "\\":
+                    self._escaped_at = i + 1
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._starts.append(i)
+            elif ch == "}" and self._starts:
+                start = self._starts.pop()
+                if start < 0:
+                    continue
+                try:
+                    obj = json_loads(self._buffer[start:i + 1])
+                except ValueError:
+                    continue
+                if isinstance(obj, dict) and "id" in obj:
+                    objects.append(obj)
+
+        # Only the innermost open object can still yield a result, so drop everything before it
+        cut = self._starts[-1] if self._starts and self._starts[-1] >= 0 else len(self._buffer)
+        if cut:
+            self._buffer = self._buffer[cut:]
+            self._starts = [start - cut for start in self._starts]
+            self._escaped_at -= cut
+        return objects
+
+class RateLimiter:
+    """Token-bucket limiter for an account's requests-per-minute and tokens-per-minute budget."""
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        # Created in acquire(): limiters are built at import time, before any event loop runs
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed, self._updated = now - self._updated, now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one request and ``tokens`` tokens fit in the budget, then spend them."""
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        async with self._lock:
+            if self.tpm:
+                # A single oversized request should wait for a full bucket, not forever
+                tokens = min(tokens, self.tpm)
+            while True:
+                self._refill()
+                wait = 0.0
+                if self.rpm and self._requests < 1:
+                    wait = (1 - self._requests) * 60 / self.rpm
+                if self.tpm and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self.rpm:
+                self._requests -= 1
+            if self.tpm:
+                self._tokens -= tokens
+
+class LLMResultCache:
+    """SQLite store of LLM categorizations keyed by endpoint/model/prompt scope, normalized description and amount sign."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # Lookups run on worker threads while writes run on the event loop
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS categorizations "
+            "(key TEXT PRIMARY KEY, type TEXT, category TEXT, confidence REAL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def key(scope: str, tx: Transaction) -> str:
+        return f"{scope}:{_normalize_description(tx.description)}:{1 if tx.amount >= 0 else -1}"
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[str, str, Optional[float]]]:
+        """Fetch cached (type, category, confidence) tuples for the given keys."""
+        unique_keys = list(dict.fromkeys(keys))
+        found = {}
+        # Stay well under SQLite's bound-parameter limit
+        with self._lock:
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, type, category, confidence FROM categorizations WHERE key IN ({placeholders})",
+                    chunk
+                )
+                for key, tx_type, category, confidence in rows:
+                    found[key] = (tx_type, category, confidence)
+        return found
+
+    def put_many(self, entries: Dict[str, Tuple[str, str, Optional[float]]]) -> None:
+        """Store categorizations in a single transaction."""
+        if not entries:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO categorizations (key, type, category, confidence) VALUES (?, ?, ?, ?)",
+                [(key, *value) for key, value in entries.items()]
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+# Heap entries rank by (key, -sequence); the transaction itself is never compared
+_HEAP_RANK = operator.itemgetter(0, 1)
+
+def _push_top_n(heap: List[Tuple[float, int, Any]], entry: Tuple[float, int, Any], n: int) -> None:
+    """Keep the n highest-ranked (key, -sequence, item) entries in a bounded min-heap."""
+    if len(heap) < n:
+        heapq.heappush(heap, entry)
+    elif _HEAP_RANK(entry) > _HEAP_RANK(heap[0]):
+        heapq.heapreplace(heap, entry)
+
+def _ranked(heap: List[Tuple[float, int, Any]]) -> List[Any]:
+    """Items of a top-n heap, highest first (earliest first among ties)."""
+    return [item for _, _, item in sorted(heap, key=_HEAP_RANK, reverse=True)]
+
+class InsightsAccumulator:
+    """Running aggregate of transaction insights, updated batch by batch."""
+
+    TOP_N = 5
+
+    def __init__(self):
+        self.count = 0
+        self.total_income = 0
+        self.expense_sum = 0
+        self.confidence_sum = 0
+        self.confidence_count = 0
+        self.low_confidence_count = 0
+        self.date_from = ""
+        self.date_to = ""
+        self.income_breakdown: Dict[str, float] = {}
+        self.expense_breakdown: Dict[str, float] = {}
+        # Min-heaps of (key, -sequence, tx); ties keep the earliest transaction
+        self._top_income: List[Tuple[float, int, Transaction]] = []
+        self._top_expenses: List[Tuple[float, int, Transaction]] = []
+
+    def update(self, transactions: Iterable[Transaction]):
+        """Fold a batch of categorized transactions into the running totals."""
+        for tx in transactions:
+            amount = tx.amount
+            if tx.type == "income":
+                self.total_income += amount
+                self.income_breakdown[tx.category] = self.income_breakdown.get(tx.category, 0) + amount
+                _push_top_n(self._top_income, (amount, -self.count, tx), self.TOP_N)
+            else:
+                abs_amount = abs(amount)
+                self.expense_breakdown[tx.category] = self.expense_breakdown.get(tx.category, 0) + abs_amount
+                if tx.type == "expense":
+                    self.expense_sum += amount
+                    _push_top_n(self._top_expenses, (abs_amount, -self.count, tx), self.TOP_N)
+
+            if tx.confidence is not None:
+                self.confidence_sum += tx.confidence
+                self.confidence_count += 1
+                if tx.confidence < 0.6:
+                    self.low_confidence_count += 1
+
+            if tx.date:
+                if not self.date_from or tx.date < self.date_from:
+                    self.date_from = tx.date
+                if tx.date > self.date_to:
+                    self.date_to = tx.date
+
+            self.count += 1
+
+    @staticmethod
+    def _top_list(heap: List[Tuple[float, int, Transaction]]) -> List[Dict[str, Any]]:
+        return [
+            {"description": tx.description, "amount": tx.amount, "category": tx.category}
+            for tx in _ranked(heap)
+        ]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current insights in the streaming payload format."""
+        if not self.count:
+            return {"summary": {"total_transactions": 0}}
+
+        total_expenses = abs(self.expense_sum)
+        avg_confidence = self.confidence_sum / self.confidence_count if self.confidence_count else 0
+
+        return {
+            "summary": {
+                "total_transactions": self.count,
+                "total_income": self.total_income,
+                "total_expenses": total_expenses,
+                "net_cash_flow": self.total_income - total_expenses,
+                "date_range": {"from": self.date_from, "to": self.date_to},
+                "categorization_confidence": avg_confidence
+            },
+            "income_breakdown": dict(self.income_breakdown),
+            "expense_breakdown": dict(self.expense_breakdown),
+            "top_expenses": self._top_list(self._top_expenses),
+            "top_income": self._top_list(self._top_income),
+            "low_confidence_count": self.low_confidence_count
+        }
+
 class FinancialAnalyzer:
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, model: Optional[str] = None):
+    # Keyword tables for the fallback categorizer
+    # Priority income keywords (these override expense keywords)
+    PRIORITY_INCOME_KEYWORDS = ('reimbursement', 'refund', 'return', 'cashback', 'deposit', 'credit', 'dividend', 'interest', 'bonus', 'gift', 'salary', 'wage', 'income')
+    OTHER_INCOME_KEYWORDS = ('payroll', 'paycheck', 'freelance', 'contract', 'consulting', 'business income', 'revenue', 'sales', 'tip')
+    EXPENSE_TYPE_KEYWORDS = ('purchase', 'payment', 'withdrawal', 'debit', 'bill', 'fee', 'charge', 'business dinner', 'business lunch')
+
+    INCOME_CATEGORY_KEYWORDS = {
+        'Salary': ['salary', 'wage', 'payroll', 'paycheck'],
+        'Freelance': ['freelance', 'contract', 'consulting'],
+        'Business Income': ['business income', 'revenue', 'sales'],
+        'Investment Returns': ['dividend', 'interest', 'capital gains'],
+        'Refunds': ['refund', 'return', 'cashback', 'reimbursement'],
+        'Gifts': ['gift', 'bonus', 'tip']
+    }
+
+    EXPENSE_CATEGORY_KEYWORDS = {
+        'Food Delivery & Takeout': ['delivery', 'order', 'takeout', 'takeaway', 'swiggy', 'zomato', 'uber eats', 'delivered'],
+        'Restaurants & Dining': ['lunch', 'dinner', 'meal', 'restaurant', 'dining', 'dine', 'brunch'],
+        'Cafes & Coffee Shops': ['coffee', 'cafe', 'tea', 'breakfast', 'espresso', 'latte', 'cappuccino'],
+        'Groceries & Supermarkets': ['grocery', 'supermarket', 'vegetables', 'fruits', 'market', 'bazaar', 'vegetables', 'food hall'],
+        'Fast Food & Quick Service': ['drive', 'counter', 'quick', 'fast food', 'sandwich', 'burger', 'pizza', 'taco', 'bell', 'kfc', 'mcdonalds'],
+        'Transportation': ['taxi', 'uber', 'ola', 'bus', 'metro', 'train', 'fuel', 'petrol', 'gas', 'parking', 'ride'],
+        'Travel & Accommodation': ['hotel', 'flight', 'travel', 'booking', 'accommodation', 'resort', 'airline', 'airport'],
+        'Shopping & Retail': ['shopping', 'store', 'retail', 'mall', 'purchase', 'buy', 'clothes', 'electronics'],
+        'Entertainment & Recreation': ['movie', 'cinema', 'netflix', 'spotify', 'gaming', 'theater', 'concert', 'entertainment'],
+        'Healthcare & Medical': ['hospital', 'doctor', 'pharmacy', 'medical', 'health', 'clinic', 'medicine', 'treatment'],
+        'Utilities & Bills': ['electric', 'electricity', 'water', 'internet', 'phone', 'cable', 'utility', 'bill'],
+        'Housing & Rent': ['rent', 'mortgage', 'housing', 'apartment', 'house payment'],
+        'Professional Services': ['subscription', 'software', 'service', 'professional', 'office', 'adobe', 'microsoft'],
+        'Fitness & Wellness': ['gym', 'fitness', 'workout', 'yoga', 'health club', 'personal training', 'membership'],
+        'Personal Care & Beauty': ['salon', 'spa', 'beauty', 'haircut', 'cosmetics', 'personal care'],
+        'Education & Learning': ['course', 'education', 'learning', 'book', 'training', 'class'],
+        'Banking & Fees': ['fee', 'charge', 'bank', 'atm', 'transfer', 'withdrawal fee'],
+        'Insurance': ['insurance', 'premium', 'policy'],
+        'Investments': ['investment', 'mutual fund', 'sip', 'stock', 'dividend']
+    }
+
+    ACTIVITY_KEYWORDS = frozenset(['lunch', 'dinner', 'breakfast', 'coffee', 'meal', 'order', 'delivery'])
+    BUSINESS_KEYWORDS = frozenset(['restaurant', 'cafe', 'hotel', 'gym', 'hospital', 'pharmacy'])
+
+    _ALL_KEYWORDS = frozenset(chain(
+        PRIORITY_INCOME_KEYWORDS,
+        OTHER_INCOME_KEYWORDS,
+        EXPENSE_TYPE_KEYWORDS,
+        ['expense'],
+        *INCOME_CATEGORY_KEYWORDS.values(),
+        *EXPENSE_CATEGORY_KEYWORDS.values()
+    ))
+    _KEYWORD_AUTOMATON = _build_keyword_automaton(_ALL_KEYWORDS)
+    SUGGESTION_CACHE_SIZE = 128
+    # Below this many uncached transactions the Batch API's queueing delay isn't worth its discount
+    BATCH_API_MIN_TRANSACTIONS = 100
+    # Batch API job states after which the job no longer runs
+    BATCH_API_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+    # OpenAI model families that accept strict json_schema structured outputs
+    STRUCTURED_OUTPUT_MODELS = ("gpt-4o", "gpt-4.1", "gpt-5")
+    # JSON files larger than this are streamed with ijson (when installed) rather than loaded whole
+    JSON_STREAM_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, model: Optional[str] = None,
+                 use_cache: Optional[bool] = None):
         self.openai_client = None
+        # In-flight calls per client, and clients replaced by reconfigure() that close once theirs finish
+        self._client_leases: Dict[Any, int] = {}
+        self._retired_clients: set = set()
+        self._llm_cache = None
+        self._pending_cache_writes: Dict[str, Tuple[str, str, Optional[float]]] = {}
+        self._suggestion_cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
         
         # Load defaults from environment variables
         default_model = os.getenv("DEFAULT_MODEL", "google/gemini-flash-1.5")
@@ -49,14 +512,29 @@ class FinancialAnalyzer:
         self.model = model or default_model
         self.base_url = base_url or default_base_url
         
-        logger.info(f"FinancialAnalyzer initialization:")
-        logger.info(f"  - api_key provided: {'Yes' if api_key else 'No'}")
-        logger.info(f"  - base_url: {self.base_url} {'(from env)' if base_url is None and os.getenv('BASE_URL') else '(default)' if base_url is None else '(provided)'}")
-        logger.info(f"  - model: {self.model} {'(from env)' if model is None and os.getenv('DEFAULT_MODEL') else '(default)' if model is None else '(provided)'}")
-        logger.info(f"  - OPENROUTER_API_KEY env: {'Set' if os.getenv('OPENROUTER_API_KEY') else 'Not set'}")
-        logger.info(f"  - OPENAI_API_KEY env: {'Set' if os.getenv('OPENAI_API_KEY') else 'Not set'}")
-        logger.info(f"  - DEFAULT_MODEL env: {'Set' if os.getenv('DEFAULT_MODEL') else 'Not set'}")
-        logger.info(f"  - BASE_URL env: {'Set' if os.getenv('BASE_URL') else 'Not set'}")
+        # Limit in-flight LLM requests to stay within provider rate limits
+        self.llm_concurrency = int(os.getenv("LLM_CONCURRENCY", "5"))
+        # Created on first use: analyzers are built at import time, before any event loop runs
+        self._llm_semaphore: Optional[asyncio.Semaphore] = None
+        self._llm_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Optional pacing to the account's rate limits (LLM_RPM / LLM_TPM, 0 = unlimited)
+        llm_rpm = int(os.getenv("LLM_RPM", "0"))
+        llm_tpm = int(os.getenv("LLM_TPM", "0"))
+        self._rate_limiter = RateLimiter(llm_rpm, llm_tpm) if llm_rpm or llm_tpm else None
+        
+        # Fixed LLM batch size; when unset it is sized from the descriptions' token budget
+        self.llm_batch_size = int(os.getenv("LLM_BATCH_SIZE", "0")) or None
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("FinancialAnalyzer initialization:")
+            logger.debug("  - api_key provided: %s", 'Yes' if api_key else 'No')
+            logger.debug("  - base_url: %s %s", self.base_url, '(from env)' if base_url is None and os.getenv('BASE_URL') else '(default)' if base_url is None else '(provided)')
+            logger.debug("  - model: %s %s", self.model, '(from env)' if model is None and os.getenv('DEFAULT_MODEL') else '(default)' if model is None else '(provided)')
+            logger.debug("  - OPENROUTER_API_KEY env: %s", 'Set' if os.getenv('OPENROUTER_API_KEY') else 'Not set')
+            logger.debug("  - OPENAI_API_KEY env: %s", 'Set' if os.getenv('OPENAI_API_KEY') else 'Not set')
+            logger.debug("  - DEFAULT_MODEL env: %s", 'Set' if os.getenv('DEFAULT_MODEL') else 'Not set')
+            logger.debug("  - BASE_URL env: %s", 'Set' if os.getenv('BASE_URL') else 'Not set')
 
         # Try to initialize client with provided parameters
         if api_key:
@@ -76,16 +554,36 @@ class FinancialAnalyzer:
         else:
             logger.warning("No API key provided. LLM categorization will be disabled.")
 
+        # Persist LLM categorizations across runs (LLM_CACHE=0 or use_cache=False disables)
+        if use_cache is None:
+            use_cache = os.getenv("LLM_CACHE", "1").lower() not in ("0", "false", "no", "off")
+        self._use_cache = use_cache
+        self._open_llm_cache()
+
+    def _open_llm_cache(self) -> None:
+        """Open the persistent LLM result cache if enabled and a client is configured."""
+        if not self._use_cache or not self.openai_client or self._llm_cache:
+            return
+        cache_path = os.path.expanduser(os.getenv("LLM_CACHE_PATH", "~/.finanalyser/llm_cache.sqlite3"))
+        try:
+            self._llm_cache = LLMResultCache(cache_path)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"LLM result cache unavailable at {cache_path}: {e}")
+
     def _initialize_client(self, api_key: str, base_url: str):
         """Initialize the OpenAI client with custom base URL for OpenRouter compatibility."""
         try:
-            logger.info(f"Initializing OpenAI client with:")
-            logger.info(f"  - base_url: {base_url}")
-            logger.info(f"  - api_key: {api_key[:10]}...{api_key[-4:] if len(api_key) > 14 else api_key}")
+            logger.debug("Initializing OpenAI client with:")
+            logger.debug("  - base_url: %s", base_url)
+            logger.debug("  - api_key: ...%s", api_key[-4:])
             
-            self.openai_client = openai.OpenAI(
+            # Retries are handled by _call_llm, so disable the SDK's own; bound each attempt so a
+            # stalled request is retried instead of hanging the pipeline (SDK default is 10 minutes)
+            self.openai_client = openai.AsyncOpenAI(
                 api_key=api_key,
-                base_url=base_url
+                base_url=base_url,
+                max_retries=0,
+                timeout=openai.Timeout(float(os.getenv("LLM_TIMEOUT", "60")), connect=5.0)
             )
             logger.info(f"✅ Successfully initialized client with base URL: {base_url}")
         except Exception as e:
@@ -127,27 +625,272 @@ class FinancialAnalyzer:
             'Other Income'
         ]
 
-    async def categorize_transactions_with_llm(self, transactions: List[Transaction]) -> List[Transaction]:
-        """Categorize transactions using LLM with batch processing for efficiency."""
+        self._categorization_prompt_prefix = self._build_categorization_prompt_prefix()
+        self._categorization_response_format = self._build_categorization_response_format()
+
+    async def reconfigure(self, api_key: str, base_url: str, model: str) -> None:
+        """Point the analyzer at a new LLM provider, keeping its caches warm."""
+        previous_client = self.openai_client
+        same_endpoint = previous_client is not None and base_url == self.base_url
+        self.base_url = base_url
+        self.model = model
+        if same_endpoint:
+            # Same provider: share the existing connection pool (and its warm TLS connections)
+            self.openai_client = previous_client.with_options(api_key=api_key)
+        else:
+            self._initialize_client(api_key, base_url)
+            if previous_client is not None and previous_client is not self.openai_client:
+                # Calls still running on the old client keep it open; the last one to finish closes it
+                if previous_client in self._client_leases:
+                    self._retired_clients.add(previous_client)
+                else:
+                    await previous_client.close()
+        self._open_llm_cache()
+
+    @asynccontextmanager
+    async def _leased_client(self) -> AsyncIterator[Tuple[Any, str, str]]:
+        """Pin the client, model and result-cache scope for one LLM call so reconfigure() can't change them mid-call."""
+        client, model, cache_scope = self.openai_client, self.model, self._llm_cache_scope()
+        self._client_leases[client] = self._client_leases.get(client, 0) + 1
+        try:
+            yield client, model, cache_scope
+        finally:
+            leases = self._client_leases.pop(client) - 1
+            if leases:
+                self._client_leases[client] = leases
+            elif client in self._retired_clients:
+                self._retired_clients.discard(client)
+                await client.close()
+
+    def _llm_slots(self) -> asyncio.Semaphore:
+        """Return the LLM concurrency semaphore for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        if self._llm_semaphore is None or self._llm_semaphore_loop is not loop:
+            self._llm_semaphore = asyncio.Semaphore(self.llm_concurrency)
+            self._llm_semaphore_loop = loop
+        return self._llm_semaphore
+
+    async def aclose(self) -> None:
+        """Close the LLM client's HTTP connection pool."""
+        if self.openai_client:
+            await self.openai_client.close()
+        for client in self._retired_clients:
+            await client.close()
+        self._retired_clients.clear()
+        if self._llm_cache:
+            self._llm_cache.close()
+            self._llm_cache = None
+
+    def _llm_cache_scope(self) -> str:
+        """Fingerprint everything besides the transaction that decides its categorization: endpoint, model and prompt."""
+        scope = f"{self.base_url}\0{self.model}\0{self._categorization_prompt_prefix}"
+        return hashlib.blake2b(scope.encode("utf-8"), digest_size=12).hexdigest()
+
+    async def _split_cached(self, transactions: List[Transaction]) -> Tuple[Dict[int, Transaction], List[int]]:
+        """Resolve transactions from the LLM result cache, returning hits by index and the indices still to categorize."""
+        if not self._llm_cache:
+            return {}, list(range(len(transactions)))
+
+        # Keying and the SQLite lookup for a whole upload run off the event loop
+        llm_cache, cache_scope = self._llm_cache, self._llm_cache_scope()
+        def lookup() -> Tuple[List[str], Dict[str, Tuple[str, str, Optional[float]]]]:
+            keys = [llm_cache.key(cache_scope, tx) for tx in transactions]
+            return keys, llm_cache.get_many(keys)
+        keys, cached = await asyncio.get_running_loop().run_in_executor(None, lookup)
+        hits = {}
+        misses = []
+        for i, (tx, key) in enumerate(zip(transactions, keys)):
+            entry = cached.get(key)
+            if entry:
+                tx_type, category, confidence = entry
+                hits[i] = Transaction(tx.date, tx.description, tx.amount, category=category, type=tx_type, confidence=confidence)
+            else:
+                misses.append(i)
+
+        logger.info(f"💾 LLM cache: {len(hits)} hits, {len(misses)} misses")
+        return hits, misses
+
+    def _flush_llm_cache(self) -> None:
+        """Write categorizations received from the LLM since the last flush."""
+        if self._llm_cache and self._pending_cache_writes:
+            try:
+                self._llm_cache.put_many(self._pending_cache_writes)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to update LLM result cache: {e}")
+        self._pending_cache_writes.clear()
+
+    @retry(
+        stop=stop_after_attempt(4),
+        wait=wait_random_exponential(min=1, max=10),
+        retry=retry_if_exception_type((
+            openai.RateLimitError,
+            openai.APITimeoutError,
+            openai.APIConnectionError,
+            openai.InternalServerError
+        )),
+        reraise=True
+    )
+    async def _call_llm(self, client: Any, model: str, messages: List[Dict[str, str]], **params: Any) -> Any:
+        """Send a chat completion request, retrying transient provider errors with backoff."""
+        if self._rate_limiter:
+            await self._rate_limiter.acquire(self._estimate_tokens(messages, params.get("max_tokens", 0)))
+        return await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            **params
+        )
+
+    @staticmethod
+    def _estimate_tokens(messages: List[Dict[str, Any]], max_tokens: int) -> int:
+        """Rough token cost of a request: prompt characters / 4 plus the reserved completion budget."""
+        chars = 0
+        for message in messages:
+            content = message["content"]
+            if isinstance(content, str):
+                chars += len(content)
+            else:
+                chars += sum(len(part.get("text", "")) for part in content)
+        return chars // 4 + max_tokens
+
+    def _json_mode_params(self) -> Dict[str, Any]:
+        """Request constrained JSON output from providers/models known to support it."""
+        if self.model.split("/", 1)[-1].startswith(self.STRUCTURED_OUTPUT_MODELS):
+            # Schema-constrained decoding: always parseable, with only known types and categories
+            return {"response_format": self._categorization_response_format}
+        if "api.openai.com" in self.base_url or self.model.startswith(("gpt-", "openai/")):
+            return {"response_format": {"type": "json_object"}}
+        return {}
+
+    async def categorize_transactions_with_llm(self, transactions: List[Transaction], async_mode: str = "sync") -> List[Transaction]:
+        """Categorize transactions using LLM with batch processing for efficiency.
+
+        Pass async_mode="batch" to submit the work through OpenAI's offline Batch API instead.
+        """
         if not self.openai_client:
             logger.warning("OpenAI client not available. Using fallback categorization.")
             return [self._fallback_categorize(tx) for tx in transactions]
 
-        # Process in batches to avoid token limits
-        batch_size = 20
-        categorized_transactions = []
+        # Only send descriptions the LLM has not categorized before
+        results, pending = await self._split_cached(transactions)
+        uncached = [transactions[i] for i in pending]
+
+        # Process in batches to avoid token limits, sending batches concurrently
+        batch_size = self._llm_batch_size_for(uncached)
+        batches = [uncached[i:i + batch_size] for i in range(0, len(uncached), batch_size)]
+
+        if async_mode == "batch" and not self.supports_batch_api():
+            logger.warning(f"Batch API is not available at {self.base_url}; categorizing synchronously")
+            async_mode = "sync"
+        if async_mode == "batch" and len(uncached) >= self.BATCH_API_MIN_TRANSACTIONS:
+            categorized = await self.categorize_transactions_batch_api(batches)
+        else:
+            categorized_batches = await asyncio.gather(*(
+                self._categorize_batch_guarded(batch, batch_number)
+                for batch_number, batch in enumerate(batches, 1)
+            ))
+            categorized = [tx for batch in categorized_batches for tx in batch]
+
+        self._flush_llm_cache()
+        results.update(zip(pending, categorized))
+        return [results[i] for i in range(len(transactions))]
+
+    def supports_batch_api(self) -> bool:
+        """Whether the configured endpoint offers the /files and /batches APIs (OpenAI does; OpenRouter doesn't)."""
+        return "api.openai.com" in self.base_url
+
+    async def categorize_transactions_batch_api(self, batches: List[List[Transaction]]) -> List[Transaction]:
+        """Categorize batches through the Batch API (discounted, separate rate limits, completes within 24h)."""
+        async with self._leased_client() as (client, model, cache_scope):
+            return await self._run_batch_api_job(client, model, cache_scope, batches)
+
+    async def _run_batch_api_job(self, client: Any, model: str, cache_scope: str, batches: List[List[Transaction]]) -> List[Transaction]:
+        """Submit, poll and collect one Batch API job on a leased client."""
+        lines = [
+            json_dumps({
+                "custom_id": f"batch-{batch_number}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": model,
+                    "messages": self._categorization_messages(batch),
+                    **self._categorization_params(len(batch))
+                }
+            })
+            for batch_number, batch in enumerate(batches, 1)
+        ]
+
+        job = None
+        try:
+            input_file = await client.files.create(
+                file=("categorization_batch.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch"
+            )
+            job = await client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            logger.info(f"📦 Submitted batch job {job.id} ({len(batches)} requests)")
+
+            # Poll with exponential backoff until the job reaches a terminal state
+            poll_interval = 5
+            while job.status not in self.BATCH_API_TERMINAL_STATUSES:
+                await asyncio.sleep(poll_interval)
+                poll_interval = min(poll_interval * 2, 300)
+                job = await client.batches.retrieve(job.id)
+
+            logger.info(f"📦 Batch job {job.id} finished with status: {job.status}")
+            results = {}
+            if job.output_file_id:
+                output = await client.files.content(job.output_file_id)
+                for line in output.text.splitlines():
+                    if line.strip():
+                        result = json_loads(line)
+                        results[result.get("custom_id")] = result
+        except asyncio.CancelledError:
+            await self._cancel_batch_job(client, job)
+            raise
+        except Exception as e:
+            logger.error(f"Batch API error: {e}")
+            await self._cancel_batch_job(client, job)
+            results = {}
 
-        for i in range(0, len(transactions), batch_size):
-            batch = transactions[i:i + batch_size]
+        categorized = []
+        for batch_number, batch in enumerate(batches, 1):
+            result = results.get(f"batch-{batch_number}")
             try:
-                categorized_batch = await self._categorize_batch(batch)
-                categorized_transactions.extend(categorized_batch)
+                if result is None:
+                    raise ValueError("no result in batch output")
+                response = result["response"]
+                if response["status_code"] != 200:
+                    raise ValueError(f"status {response['status_code']}")
+                content = response["body"]["choices"][0]["message"]["content"]
+                categorized.extend(self._apply_categorizations(batch, content, cache_scope))
             except Exception as e:
-                logger.error(f"Error categorizing batch {i//batch_size + 1}: {e}")
-                # Use fallback for failed batch
-                categorized_transactions.extend([self._fallback_categorize(tx) for tx in batch])
+                logger.error(f"Error categorizing batch {batch_number} via Batch API: {e}")
+                categorized.extend(self._fallback_categorize(tx) for tx in batch)
+
+        return categorized
 
-        return categorized_transactions
+    async def _cancel_batch_job(self, client: Any, job) -> None:
+        """Cancel a submitted Batch API job whose results will no longer be collected."""
+        if job is None or job.status in self.BATCH_API_TERMINAL_STATUSES:
+            return
+        try:
+            await client.batches.cancel(job.id)
+            logger.info(f"📦 Cancelled batch job {job.id}")
+        except Exception as e:
+            logger.warning(f"Could not cancel batch job {job.id}: {e}")
+
+    async def _categorize_batch_guarded(self, batch: List[Transaction], batch_number: int) -> List[Transaction]:
+        """Categorize a batch under the concurrency limit, falling back if it fails."""
+        async with self._llm_slots():
+            try:
+                return await self._categorize_batch(batch)
+            except Exception as e:
+                logger.error(f"Error categorizing batch {batch_number}: {e}")
+                # Use fallback for failed batch
+                return [self._fallback_categorize(tx) for tx in batch]
 
     async def categorize_transactions_streaming(self, transactions: List[Transaction]):
         """Stream categorized transactions in batches for real-time UI updates."""
@@ -157,155 +900,177 @@ class FinancialAnalyzer:
             batch_size = 20
             total_batches = len(transactions) // batch_size + (1 if len(transactions) % batch_size else 0)
             
-            all_processed = []
+            insights = InsightsAccumulator()
             for i in range(0, len(transactions), batch_size):
                 batch = transactions[i:i + batch_size]
                 categorized_batch = [self._fallback_categorize(tx) for tx in batch]
-                all_processed.extend(categorized_batch)
-                
-                # Generate insights for fallback mode
-                incremental_insights = self.generate_incremental_insights(all_processed)
+                insights.update(categorized_batch)
                 
                 yield {
                     "event": "batch_complete",
                     "batch_number": i // batch_size + 1,
                     "total_batches": total_batches,
                     "progress_percentage": min(((i + batch_size) / len(transactions)) * 100, 100),
-                    "new_transactions": [asdict(tx) for tx in categorized_batch],
-                    "total_processed": len(all_processed),
-                    "insights": incremental_insights
+                    "new_transactions": [tx.to_dict() for tx in categorized_batch],
+                    "total_processed": insights.count,
+                    "insights": insights.snapshot()
                 }
             return
 
-        # Process in batches with streaming
-        batch_size = 20
-        total_batches = len(transactions) // batch_size + (1 if len(transactions) % batch_size else 0)
-        all_categorized = []
+        # Only send descriptions the LLM has not categorized before; cached ones are emitted up front
+        results, pending = await self._split_cached(transactions)
+        uncached = [transactions[i] for i in pending]
+        cached = [results[i] for i in sorted(results)]
+        batch_size = self._llm_batch_size_for(uncached or transactions)
+        cached_batches = [cached[i:i + batch_size] for i in range(0, len(cached), batch_size)]
+
+        # Stream all batches concurrently (bounded by the LLM semaphore), emitting events in batch order
+        batches = [uncached[i:i + batch_size] for i in range(0, len(uncached), batch_size)]
+        first_llm_batch = len(cached_batches) + 1
+        total_batches = len(cached_batches) + len(batches)
+        insights = InsightsAccumulator()
+        queues = [asyncio.Queue() for _ in batches]
+        tasks = [
+            asyncio.create_task(self._stream_batch_into(batch, batch_number, total_batches, queue))
+            for batch_number, (batch, queue) in enumerate(zip(batches, queues), first_llm_batch)
+        ]
 
-        for i in range(0, len(transactions), batch_size):
-            batch = transactions[i:i + batch_size]
-            batch_number = i // batch_size + 1
-            
-            try:
-                logger.info(f"🔄 Processing batch {batch_number}/{total_batches} ({len(batch)} transactions)")
-                categorized_batch = await self._categorize_batch(batch)
-                all_categorized.extend(categorized_batch)
-                
-                # Calculate progress
-                progress_percentage = min(((i + len(batch)) / len(transactions)) * 100, 100)
-                
-                # Generate incremental insights
-                incremental_insights = self.generate_incremental_insights(all_categorized)
-                
-                # Yield batch results immediately
-                yield {
-                    "event": "batch_complete",
-                    "batch_number": batch_number,
-                    "total_batches": total_batches,
-                    "progress_percentage": progress_percentage,
-                    "new_transactions": [asdict(tx) for tx in categorized_batch],
-                    "total_processed": len(all_categorized),
-                    "insights": incremental_insights
-                }
-                
-            except Exception as e:
-                logger.error(f"Error categorizing batch {batch_number}: {e}")
-                # Use fallback for failed batch but continue streaming
-                fallback_batch = [self._fallback_categorize(tx) for tx in batch]
-                all_categorized.extend(fallback_batch)
-                
-                progress_percentage = min(((i + len(batch)) / len(transactions)) * 100, 100)
-                
-                # Generate insights even for fallback
-                incremental_insights = self.generate_incremental_insights(all_categorized)
-                
+        try:
+            processed = 0
+            for batch_number, batch in enumerate(cached_batches, 1):
+                processed += len(batch)
+                insights.update(batch)
                 yield {
                     "event": "batch_complete",
                     "batch_number": batch_number,
                     "total_batches": total_batches,
-                    "progress_percentage": progress_percentage,
-                    "new_transactions": [asdict(tx) for tx in fallback_batch],
-                    "total_processed": len(all_categorized),
-                    "insights": incremental_insights,
-                    "error": f"Batch {batch_number} failed, used fallback categorization"
+                    "progress_percentage": min((processed / len(transactions)) * 100, 100),
+                    "new_transactions": [tx.to_dict() for tx in batch],
+                    "total_processed": insights.count,
+                    "insights": insights.snapshot()
                 }
 
+            for batch_number, (batch, queue) in enumerate(zip(batches, queues), first_llm_batch):
+                processed += len(batch)
+                progress_percentage = min((processed / len(transactions)) * 100, 100)
+
+                try:
+                    categorized_batch = [None] * len(batch)
+                    while True:
+                        item = await queue.get()
+                        if item is None:
+                            break
+                        if isinstance(item, Exception):
+                            raise item
+                        tx_index, categorized_tx = item
+                        categorized_batch[tx_index] = categorized_tx
+                        # Yield each transaction as soon as the model has decoded it
+                        yield {
+                            "event": "tx_complete",
+                            "batch_number": batch_number,
+                            "transaction": categorized_tx.to_dict()
+                        }
+                    self._flush_llm_cache()
+                    insights.update(categorized_batch)
+
+                    # Yield batch results immediately
+                    yield {
+                        "event": "batch_complete",
+                        "batch_number": batch_number,
+                        "total_batches": total_batches,
+                        "progress_percentage": progress_percentage,
+                        "new_transactions": [tx.to_dict() for tx in categorized_batch],
+                        "total_processed": insights.count,
+                        "insights": insights.snapshot()
+                    }
+
+                except Exception as e:
+                    logger.error(f"Error categorizing batch {batch_number}: {e}")
+                    # Use fallback for failed batch but continue streaming
+                    fallback_batch = [self._fallback_categorize(tx) for tx in batch]
+                    insights.update(fallback_batch)
+
+                    yield {
+                        "event": "batch_complete",
+                        "batch_number": batch_number,
+                        "total_batches": total_batches,
+                        "progress_percentage": progress_percentage,
+                        "new_transactions": [tx.to_dict() for tx in fallback_batch],
+                        "total_processed": insights.count,
+                        "insights": insights.snapshot(),
+                        "error": f"Batch {batch_number} failed, used fallback categorization"
+                    }
+        finally:
+            # Stop outstanding requests if the consumer goes away early
+            for task in tasks:
+                task.cancel()
+
+    async def _stream_batch_into(self, batch: List[Transaction], batch_number: int, total_batches: int,
+                                 queue: "asyncio.Queue[Any]") -> None:
+        """Stream a batch's categorizations into a queue, ending with None or the exception raised."""
+        # Acquiring the semaphore can fail too; the consumer waits on this queue, so every failure must reach it
+        try:
+            async with self._llm_slots():
+                logger.info(f"🔄 Processing batch {batch_number}/{total_batches} ({len(batch)} transactions)")
+                async for item in self._categorize_batch_stream(batch):
+                    queue.put_nowait(item)
+        except Exception as e:
+            queue.put_nowait(e)
+        else:
+            queue.put_nowait(None)
+
     def generate_incremental_insights(self, transactions: List[Transaction]) -> Dict[str, Any]:
         """Generate lightweight insights for streaming updates."""
-        if not transactions:
-            return {"summary": {"total_transactions": 0}}
-
-        # Calculate basic metrics
-        total_income = sum(tx.amount for tx in transactions if tx.type == "income")
-        total_expenses = abs(sum(tx.amount for tx in transactions if tx.type == "expense"))
-        net_cash_flow = total_income - total_expenses
-        
-        # Calculate confidence
-        confidences = [tx.confidence for tx in transactions if tx.confidence is not None]
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-        
-        # Get date range
-        dates = [tx.date for tx in transactions if tx.date]
-        date_range = {
-            "from": min(dates) if dates else "",
-            "to": max(dates) if dates else ""
-        }
-        
-        # Category breakdowns
-        income_breakdown = {}
-        expense_breakdown = {}
-        
-        for tx in transactions:
-            if tx.type == "income":
-                income_breakdown[tx.category] = income_breakdown.get(tx.category, 0) + tx.amount
-            else:
-                expense_breakdown[tx.category] = expense_breakdown.get(tx.category, 0) + abs(tx.amount)
-        
-        # Top transactions (limit to avoid large payloads)
-        expenses_sorted = sorted([tx for tx in transactions if tx.type == "expense"], 
-                               key=lambda x: abs(x.amount), reverse=True)
-        income_sorted = sorted([tx for tx in transactions if tx.type == "income"], 
-                             key=lambda x: x.amount, reverse=True)
-        
-        return {
-            "summary": {
-                "total_transactions": len(transactions),
-                "total_income": total_income,
-                "total_expenses": total_expenses,
-                "net_cash_flow": net_cash_flow,
-                "date_range": date_range,
-                "categorization_confidence": avg_confidence
-            },
-            "income_breakdown": income_breakdown,
-            "expense_breakdown": expense_breakdown,
-            "top_expenses": [
-                {"description": tx.description, "amount": tx.amount, "category": tx.category}
-                for tx in expenses_sorted[:5]
-            ],
-            "top_income": [
-                {"description": tx.description, "amount": tx.amount, "category": tx.category}
-                for tx in income_sorted[:5]
-            ],
-            "low_confidence_count": len([tx for tx in transactions if tx.confidence < 0.6])
-        }
+        accumulator = InsightsAccumulator()
+        accumulator.update(transactions)
+        return accumulator.snapshot()
 
     async def _categorize_batch(self, transactions: List[Transaction]) -> List[Transaction]:
         """Categorize a batch of transactions using OpenAI API."""
+        try:
+            async with self._leased_client() as (client, model, cache_scope):
+                logger.debug("🚀 Making LLM API call:")
+                logger.debug("  - model: %s", model)
+                logger.debug("  - base_url: %s", client.base_url)
+                logger.debug("  - batch size: %d transactions", len(transactions))
+                
+                response = await self._call_llm(
+                    client,
+                    model,
+                    self._categorization_messages(transactions),
+                    **self._categorization_params(len(transactions))
+                )
+            
+            logger.debug("✅ Received response from LLM API")
+            logger.debug("  - tokens used: %s", response.usage.total_tokens if response.usage else 'unknown')
 
-        # Prepare the prompt
-        transaction_data = []
-        for i, tx in enumerate(transactions):
-            transaction_data.append({
-                "id": i,
-                "date": tx.date,
-                "description": tx.description,
-                "amount": tx.amount
-            })
+            return self._apply_categorizations(transactions, response.choices[0].message.content, cache_scope)
 
+        except Exception as e:
+            logger.error(f"OpenAI API error: {e}")
+            return [self._fallback_categorize(tx) for tx in transactions]
+
+    def _categorization_params(self, batch_size: int) -> Dict[str, Any]:
+        """Sampling parameters for categorization requests, with room for ~40 output tokens per transaction."""
+        return {"temperature": 0.1, "max_tokens": max(2000, batch_size * 40), **self._json_mode_params()}
+
+    def _llm_batch_size_for(self, transactions: List[Transaction]) -> int:
+        """Choose how many transactions to send per LLM request."""
+        if self.llm_batch_size:
+            return self.llm_batch_size
+        sample = transactions[:200]
+        if not sample:
+            return 20
+        # Rough token estimate (~4 characters per token) of the descriptions
+        avg_tokens = sum(len(tx.description) for tx in sample) / len(sample) / 4
+        return max(5, min(80, int(1500 / (avg_tokens + 8))))
+
+    def _build_categorization_prompt_prefix(self) -> str:
+        """Render the batch-invariant part of the categorization prompt (rules and category lists)."""
         expense_categories_str = ", ".join(self.expense_categories)
         income_categories_str = ", ".join(self.income_categories)
 
-        prompt = f"""
+        return f"""
 You are a financial transaction categorizer. Analyze the following transactions and categorize each one using CONTEXT-AWARE analysis.
 
 For each transaction, determine:
@@ -316,9 +1081,6 @@ For each transaction, determine:
 Expense Categories: {expense_categories_str}
 Income Categories: {income_categories_str}
 
-Transactions to categorize:
-{json.dumps(transaction_data, indent=2)}
-
 CONTEXT-AWARE CATEGORIZATION RULES:
 
 1. ACTIVITY-BASED ANALYSIS (Primary Method):
@@ -362,244 +1124,391 @@ CONTEXT-AWARE CATEGORIZATION RULES:
    - Focus on what the person DID (ate lunch, bought coffee, paid bill)
    - Use context clues to understand transaction purpose
 
-Respond with a JSON array where each object has:
+Respond with a JSON object whose "results" array has one object per transaction:
 {{"id": transaction_id, "type": "income/expense", "category": "category_name", "confidence": confidence_score}}
 
 Example response:
-[
+{{"results": [
   {{"id": 0, "type": "expense", "category": "Restaurants & Dining", "confidence": 0.95}},
   {{"id": 1, "type": "income", "category": "Salary", "confidence": 0.90}}
-]
+]}}
+
+Transactions to categorize:
 """
 
-        try:
-            logger.info(f"🚀 Making LLM API call:")
-            logger.info(f"  - model: {self.model}")
-            logger.info(f"  - base_url: {self.openai_client.base_url if self.openai_client else 'None'}")
-            logger.info(f"  - batch size: {len(transactions)} transactions")
-            
-            response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a financial transaction categorizer. Always respond with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=2000
-            )
-            
-            logger.info(f"✅ Received response from LLM API")
-            logger.info(f"  - tokens used: {response.usage.total_tokens if response.usage else 'unknown'}")
-
-            # Parse the response
-            categorizations = json.loads(response.choices[0].message.content)
-
-            # Apply categorizations to transactions
-            categorized_transactions = []
-            for tx in transactions:
-                categorized_tx = Transaction(
-                    date=tx.date,
-                    description=tx.description,
-                    amount=tx.amount
-                )
+    def _build_categorization_response_format(self) -> Dict[str, Any]:
+        """Structured-output schema for the categorization reply, matching the prompt's "results" format."""
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "transaction_categories",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "results": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "id": {"type": "integer"},
+                                    "type": {"type": "string", "enum": ["income", "expense"]},
+                                    "category": {"type": "string", "enum": self.expense_categories + self.income_categories},
+                                    "confidence": {"type": "number"}
+                                },
+                                "required": ["id", "type", "category", "confidence"],
+                                "additionalProperties": False
+                            }
+                        }
+                    },
+                    "required": ["results"],
+                    "additionalProperties": False
+                }
+            }
+        }
 
-                # Find matching categorization
-                tx_index = transactions.index(tx)
-                categorization = next((cat for cat in categorizations if cat["id"] == tx_index), None)
+    def _categorization_messages(self, transactions: List[Transaction]) -> List[Dict[str, Any]]:
+        """Build the chat messages asking the LLM to categorize a batch of transactions."""
+        transaction_data = [
+            {"id": i, "date": tx.date, "description": tx.description, "amount": tx.amount}
+            for i, tx in enumerate(transactions)
+        ]
+        transactions_json = json_dumps(transaction_data)
+
+        # Keep the static prefix byte-identical across batches so providers can cache it
+        if self.model.startswith("anthropic/"):
+            user_content: Any = [
+                {"type": "text", "text": self._categorization_prompt_prefix, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": transactions_json}
+            ]
+        else:
+            user_content = self._categorization_prompt_prefix + transactions_json
 
-                if categorization:
-                    categorized_tx.type = categorization["type"]
-                    categorized_tx.category = categorization["category"]
-                    categorized_tx.confidence = categorization.get("confidence", 0.5)
-                else:
-                    # Fallback
-                    categorized_tx = self._fallback_categorize(categorized_tx)
+        return [
+            {"role": "system", "content": "You are a financial transaction categorizer. Always respond with valid JSON."},
+            {"role": "user", "content": user_content}
+        ]
+
+    def _apply_categorizations(self, transactions: List[Transaction], content: str, cache_scope: str) -> List[Transaction]:
+        """Apply the LLM's JSON categorizations to a batch, falling back per missing transaction."""
+        # Parse the response
+        categorizations = json_loads(content)
+        if isinstance(categorizations, dict):
+            categorizations = categorizations.get("results", [])
+
+        # Apply categorizations to transactions
+        categorizations_by_id = {cat.get("id"): cat for cat in categorizations}
+        return [
+            self._apply_categorization(tx, categorizations_by_id.get(tx_index), cache_scope)
+            for tx_index, tx in enumerate(transactions)
+        ]
 
-                categorized_transactions.append(categorized_tx)
+    def _apply_categorization(self, tx: Transaction, categorization: Optional[Dict[str, Any]], cache_scope: str) -> Transaction:
+        """Copy a transaction with the LLM's categorization (cached under ``cache_scope``), or the fallback when there is none."""
+        categorized_tx = Transaction(
+            date=tx.date,
+            description=tx.description,
+            amount=tx.amount
+        )
+
+        if categorization:
+            categorized_tx.type = categorization["type"]
+            categorized_tx.category = categorization["category"]
+            categorized_tx.confidence = categorization.get("confidence", 0.5)
+            if self._llm_cache:
+                self._pending_cache_writes[self._llm_cache.key(cache_scope, tx)] = (
+                    categorized_tx.type, categorized_tx.category, categorized_tx.confidence
+                )
+        else:
+            # Fallback
+            categorized_tx = self._fallback_categorize(categorized_tx)
 
-            return categorized_transactions
+        return categorized_tx
 
+    async def _categorize_batch_stream(self, transactions: List[Transaction]):
+        """Categorize a batch with a streamed completion, yielding (index, transaction) as each one is decoded."""
+        pending = set(range(len(transactions)))
+        cache_scope = self._llm_cache_scope()
+        try:
+            # The lease covers reading the stream, not just opening it
+            async with self._leased_client() as (client, model, cache_scope):
+                stream = await self._call_llm(
+                    client,
+                    model,
+                    self._categorization_messages(transactions),
+                    stream=True,
+                    **self._categorization_params(len(transactions))
+                )
+                parser = StreamingObjectParser()
+                async for chunk in stream:
+                    content = chunk.choices[0].delta.content if chunk.choices else None
+                    if not content:
+                        continue
+                    for categorization in parser.feed(content):
+                        tx_index = categorization.get("id")
+                        if tx_index in pending:
+                            pending.discard(tx_index)
+                            yield tx_index, self._apply_categorization(transactions[tx_index], categorization, cache_scope)
         except Exception as e:
-            logger.error(f"OpenAI API error: {e}")
-            return [self._fallback_categorize(tx) for tx in transactions]
+            logger.error(f"OpenAI API streaming error: {e}")
+
+        # Anything the model skipped (or never reached) gets the keyword fallback
+        for tx_index in sorted(pending):
+            yield tx_index, self._apply_categorization(transactions[tx_index], None, cache_scope)
 
     def _fallback_categorize(self, transaction: Transaction) -> Transaction:
         """Fallback categorization using keyword matching."""
-        description = transaction.description.lower()
-        amount = transaction.amount
+        if self.openai_client is not None:
+            # With a client configured, a fallback means the LLM result was lost
+            _note_llm_fallback("categorization")
+        transaction.type, transaction.category, transaction.confidence = self._classify_description(
+            _normalize_description(transaction.description),
+            transaction.amount > 0
+        )
+        return transaction
+
+    @classmethod
+    def _matched_keywords(cls, description: str) -> FrozenSet[str]:
+        """Find every fallback keyword occurring in the description in a single scan."""
+        if cls._KEYWORD_AUTOMATON is not None:
+            return frozenset(keyword for _, keyword in cls._KEYWORD_AUTOMATON.iter(description))
+        return frozenset(keyword for keyword in cls._ALL_KEYWORDS if keyword in description)
+
+    @classmethod
+    @lru_cache(maxsize=50000)
+    def _classify_description(cls, description: str, is_positive: bool) -> Tuple[str, str, float]:
+        """Keyword-match a normalized description, returning (type, category, confidence)."""
+        matched = cls._matched_keywords(description)
 
-        # Priority income keywords (these override expense keywords)
-        priority_income_keywords = ['reimbursement', 'refund', 'return', 'cashback', 'deposit', 'credit', 'dividend', 'interest', 'bonus', 'gift', 'salary', 'wage', 'income']
-        
         # Check for priority income keywords first (these override everything)
-        if any(keyword in description for keyword in priority_income_keywords):
-            transaction.type = "income"
+        if any(keyword in matched for keyword in cls.PRIORITY_INCOME_KEYWORDS):
+            tx_type = "income"
         # Then check for other income patterns
-        elif any(keyword in description for keyword in ['payroll', 'paycheck', 'freelance', 'contract', 'consulting', 'business income', 'revenue', 'sales', 'tip']):
-            transaction.type = "income"
+        elif any(keyword in matched for keyword in cls.OTHER_INCOME_KEYWORDS):
+            tx_type = "income"
         # Then check for expense keywords
-        elif any(keyword in description for keyword in ['purchase', 'payment', 'withdrawal', 'debit', 'bill', 'fee', 'charge', 'business dinner', 'business lunch']):
-            transaction.type = "expense"
+        elif any(keyword in matched for keyword in cls.EXPENSE_TYPE_KEYWORDS):
+            tx_type = "expense"
         # Special case: if contains "expense" but also "reimbursement", it's income
-        elif 'expense' in description and 'reimbursement' in description:
-            transaction.type = "income"
+        elif 'expense' in matched and 'reimbursement' in matched:
+            tx_type = "income"
         else:
             # Fallback to amount-based logic
-            transaction.type = "income" if amount > 0 else "expense"
-        
+            tx_type = "income" if is_positive else "expense"
 
         # Simple keyword-based categorization
-        if transaction.type == "income":
-            income_keywords = {
-                'Salary': ['salary', 'wage', 'payroll', 'paycheck'],
-                'Freelance': ['freelance', 'contract', 'consulting'],
-                'Business Income': ['business income', 'revenue', 'sales'],
-                'Investment Returns': ['dividend', 'interest', 'capital gains'],
-                'Refunds': ['refund', 'return', 'cashback', 'reimbursement'],
-                'Gifts': ['gift', 'bonus', 'tip']
-            }
-
-            for category, keywords in income_keywords.items():
-                if any(keyword in description for keyword in keywords):
-                    transaction.category = category
-                    transaction.confidence = 0.7
-                    return transaction
+        if tx_type == "income":
+            for category, keywords in cls.INCOME_CATEGORY_KEYWORDS.items():
+                if any(keyword in matched for keyword in keywords):
+                    return tx_type, category, 0.7
 
-            transaction.category = "Other Income"
-            transaction.confidence = 0.3
+            return tx_type, "Other Income", 0.3
         else:
-            expense_keywords = {
-                'Food Delivery & Takeout': ['delivery', 'order', 'takeout', 'takeaway', 'swiggy', 'zomato', 'uber eats', 'delivered'],
-                'Restaurants & Dining': ['lunch', 'dinner', 'meal', 'restaurant', 'dining', 'dine', 'brunch'],
-                'Cafes & Coffee Shops': ['coffee', 'cafe', 'tea', 'breakfast', 'espresso', 'latte', 'cappuccino'],
-                'Groceries & Supermarkets': ['grocery', 'supermarket', 'vegetables', 'fruits', 'market', 'bazaar', 'vegetables', 'food hall'],
-                'Fast Food & Quick Service': ['drive', 'counter', 'quick', 'fast food', 'sandwich', 'burger', 'pizza', 'taco', 'bell', 'kfc', 'mcdonalds'],
-                'Transportation': ['taxi', 'uber', 'ola', 'bus', 'metro', 'train', 'fuel', 'petrol', 'gas', 'parking', 'ride'],
-                'Travel & Accommodation': ['hotel', 'flight', 'travel', 'booking', 'accommodation', 'resort', 'airline', 'airport'],
-                'Shopping & Retail': ['shopping', 'store', 'retail', 'mall', 'purchase', 'buy', 'clothes', 'electronics'],
-                'Entertainment & Recreation': ['movie', 'cinema', 'netflix', 'spotify', 'gaming', 'theater', 'concert', 'entertainment'],
-                'Healthcare & Medical': ['hospital', 'doctor', 'pharmacy', 'medical', 'health', 'clinic', 'medicine', 'treatment'],
-                'Utilities & Bills': ['electric', 'electricity', 'water', 'internet', 'phone', 'cable', 'utility', 'bill'],
-                'Housing & Rent': ['rent', 'mortgage', 'housing', 'apartment', 'house payment'],
-                'Professional Services': ['subscription', 'software', 'service', 'professional', 'office', 'adobe', 'microsoft'],
-                'Fitness & Wellness': ['gym', 'fitness', 'workout', 'yoga', 'health club', 'personal training', 'membership'],
-                'Personal Care & Beauty': ['salon', 'spa', 'beauty', 'haircut', 'cosmetics', 'personal care'],
-                'Education & Learning': ['course', 'education', 'learning', 'book', 'training', 'class'],
-                'Banking & Fees': ['fee', 'charge', 'bank', 'atm', 'transfer', 'withdrawal fee'],
-                'Insurance': ['insurance', 'premium', 'policy'],
-                'Investments': ['investment', 'mutual fund', 'sip', 'stock', 'dividend']
-            }
-
             # Enhanced confidence scoring based on keyword strength and context
             best_match = None
             best_confidence = 0.0
             
-            for category, keywords in expense_keywords.items():
-                for keyword in keywords:
-                    if keyword in description:
-                        # Calculate confidence based on keyword strength and context
-                        confidence = 0.7  # Base confidence
-                        
-                        # Boost confidence for activity keywords
-                        activity_keywords = ['lunch', 'dinner', 'breakfast', 'coffee', 'meal', 'order', 'delivery']
-                        if keyword in activity_keywords:
-                            confidence = 0.85
-                        
-                        # Boost confidence for exact business type matches
-                        business_keywords = ['restaurant', 'cafe', 'hotel', 'gym', 'hospital', 'pharmacy']
-                        if keyword in business_keywords:
-                            confidence = 0.9
-                        
-                        # Boost confidence if multiple keywords match from same category
-                        matching_keywords = [kw for kw in keywords if kw in description]
-                        if len(matching_keywords) > 1:
-                            confidence = min(0.95, confidence + 0.1 * (len(matching_keywords) - 1))
-                        
-                        # Check for exact keyword match vs partial
-                        if keyword == description.lower().strip():
-                            confidence = min(0.95, confidence + 0.1)
-                        
-                        if confidence > best_confidence:
-                            best_match = category
-                            best_confidence = confidence
+            for category, keywords in cls.EXPENSE_CATEGORY_KEYWORDS.items():
+                matching_keywords = [kw for kw in keywords if kw in matched]
+                for keyword in matching_keywords:
+                    # Calculate confidence based on keyword strength and context
+                    confidence = 0.7  # Base confidence
+                    
+                    # Boost confidence for activity keywords
+                    if keyword in cls.ACTIVITY_KEYWORDS:
+                        confidence = 0.85
+                    
+                    # Boost confidence for exact business type matches
+                    if keyword in cls.BUSINESS_KEYWORDS:
+                        confidence = 0.9
+                    
+                    # Boost confidence if multiple keywords match from same category
+                    if len(matching_keywords) > 1:
+                        confidence = min(0.95, confidence + 0.1 * (len(matching_keywords) - 1))
+                    
+                    # Check for exact keyword match vs partial
+                    if keyword == description:
+                        confidence = min(0.95, confidence + 0.1)
+                    
+                    if confidence > best_confidence:
+                        best_match = category
+                        best_confidence = confidence
             
             if best_match:
-                transaction.category = best_match
-                transaction.confidence = best_confidence
-                return transaction
+                return tx_type, best_match, best_confidence
 
-            transaction.category = "Other"
-            transaction.confidence = 0.3
-
-        return transaction
+            return tx_type, "Other", 0.3
 
     def parse_csv_file(self, file_path: str) -> List[Transaction]:
         """Parse CSV file and return list of transactions."""
+        try:
+            with open(file_path, 'rb') as file:
+                return self.parse_csv_stream(file)
+        except OSError as e:
+            raise Exception(f"Error parsing CSV file: {e}")
+
+    def parse_csv_stream(self, file: BinaryIO) -> List[Transaction]:
+        """Parse CSV data from a binary file object and return list of transactions."""
         transactions = []
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                # Try to detect delimiter
-                sample = file.read(1024)
-                file.seek(0)
-
-                sniffer = csv.Sniffer()
-                delimiter = sniffer.sniff(sample).delimiter
-
-                reader = csv.DictReader(file, delimiter=delimiter)
-
-                for row in reader:
-                    # Handle different column name variations
-                    date = row.get('date') or row.get('Date') or row.get('DATE') or ''
-                    description = row.get('description') or row.get('Description') or row.get('DESCRIPTION') or ''
-                    amount_str = row.get('amount') or row.get('Amount') or row.get('AMOUNT') or '0'
-
-                    try:
-                        amount = float(amount_str.replace(',', '').replace('$', ''))
-                    except ValueError:
-                        amount = 0.0
-
-                    transaction = Transaction(
-                        date=date,
-                        description=description,
-                        amount=amount
-                    )
-                    transactions.append(transaction)
+            # Read the data once; the sniffer, pyarrow and the csv module all work from memory
+            raw = file.read()
+            # Universal newlines, as text-mode open() would apply
+            if b'\r' in raw:
+                raw = raw.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+            text = io.StringIO(raw.decode('utf-8'))
+
+            # Try to detect delimiter
+            sample = text.read(1024)
+            text.seek(0)
+
+            sniffer = csv.Sniffer()
+            delimiter = sniffer.sniff(sample).delimiter
+
+            reader = csv.DictReader(text, delimiter=delimiter)
+
+            # Resolve which column name variation each field uses once, not per row
+            columns = self._resolve_csv_columns(reader.fieldnames or [])
+
+            if pyarrow_csv is not None:
+                try:
+                    return self._parse_csv_with_arrow(raw, delimiter, columns)
+                except pyarrow.ArrowInvalid as e:
+                    logger.warning(f"Arrow CSV parser failed, falling back to csv module: {e}")
+
+            date_col, description_col, amount_col = columns
+            for row in reader:
+                date = (row[date_col] or '') if date_col else ''
+                description = (row[description_col] or '') if description_col else ''
+                amount_str = (row[amount_col] or '0') if amount_col else '0'
+
+                transaction = Transaction(
+                    date=date,
+                    description=description,
+                    amount=self._parse_amount(amount_str)
+                )
+                transactions.append(transaction)
 
         except Exception as e:
             raise Exception(f"Error parsing CSV file: {e}")
 
         return transactions
 
+    @staticmethod
+    def _parse_amount(amount_str: str) -> float:
+        """Parse an amount cell, tolerating thousands separators and currency symbols."""
+        try:
+            return float(amount_str.translate(_AMOUNT_STRIP_TABLE))
+        except ValueError:
+            return 0.0
+
+    @staticmethod
+    def _resolve_csv_columns(fieldnames: List[str]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Pick the date/description/amount header names, preferring variants in CSV_COLUMN_VARIANTS order."""
+        return tuple(
+            next((name for name in CSV_COLUMN_VARIANTS[field] if name in fieldnames), None)
+            for field in ("date", "description", "amount")
+        )
+
+    def _parse_csv_with_arrow(self, raw: bytes, delimiter: str,
+                              columns: Tuple[Optional[str], Optional[str], Optional[str]]) -> List[Transaction]:
+        """Parse a CSV with pyarrow's C++ reader, reading only the recognised columns as strings."""
+        present = [name for name in columns if name]
+        table = pyarrow_csv.read_csv(
+            pyarrow.BufferReader(raw),
+            parse_options=pyarrow_csv.ParseOptions(delimiter=delimiter, newlines_in_values=True),
+            convert_options=pyarrow_csv.ConvertOptions(
+                include_columns=present,
+                column_types={name: pyarrow.string() for name in present}
+            )
+        )
+
+        def column_values(name: Optional[str], default: str) -> Iterable[str]:
+            if not name:
+                return [default] * table.num_rows
+            return [value or default for value in table.column(name).to_pylist()]
+
+        date_col, description_col, amount_col = columns
+        return [
+            Transaction(date, description, self._parse_amount(amount_str))
+            for date, description, amount_str in zip(
+                column_values(date_col, ""),
+                column_values(description_col, ""),
+                column_values(amount_col, "0")
+            )
+        ]
+
     def parse_json_file(self, file_path: str) -> List[Transaction]:
         """Parse JSON file and return list of transactions."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-
-                # Handle different JSON structures
-                if isinstance(data, list):
-                    transactions_data = data
-                elif isinstance(data, dict) and 'transactions' in data:
-                    transactions_data = data['transactions']
-                else:
-                    raise ValueError("Invalid JSON structure")
+            with open(file_path, 'rb') as file:
+                return self.parse_json_stream(file)
+        except OSError as e:
+            raise Exception(f"Error parsing JSON file: {e}")
 
-                transactions = []
-                for tx_data in transactions_data:
-                    transaction = Transaction(
-                        date=tx_data.get('date', ''),
-                        description=tx_data.get('description', ''),
-                        amount=float(tx_data.get('amount', 0))
-                    )
-                    transactions.append(transaction)
+    def parse_json_stream(self, file: BinaryIO) -> List[Transaction]:
+        """Parse JSON data from a seekable binary file object and return list of transactions."""
+        try:
+            start = file.tell()
+            size = file.seek(0, os.SEEK_END) - start
+            file.seek(start)
+            if ijson is not None and size > self.JSON_STREAM_THRESHOLD_BYTES:
+                transactions = self._parse_json_items(file)
+                if transactions is not None:
+                    return transactions
+                file.seek(start)
+
+            data = json_loads(file.read())
+
+            # Handle different JSON structures
+            if isinstance(data, list):
+                transactions_data = data
+            elif isinstance(data, dict) and 'transactions' in data:
+                transactions_data = data['transactions']
+            else:
+                raise ValueError("Invalid JSON structure")
 
-                return transactions
+            return [self._transaction_from_json(tx_data) for tx_data in transactions_data]
 
         except Exception as e:
             raise Exception(f"Error parsing JSON file: {e}")
 
+    def _parse_json_items(self, file: BinaryIO) -> Optional[List[Transaction]]:
+        """Stream transactions out of large JSON data with ijson, or return None to fall back to a full parse."""
+        start = file.tell()
+        head = file.read(4096).lstrip()
+        file.seek(start)
+        if head.startswith(b'['):
+            prefix = 'item'
+        elif head.startswith(b'{'):
+            prefix = 'transactions.item'
+        else:
+            return None
+
+        try:
+            transactions = [
+                self._transaction_from_json(tx_data)
+                for tx_data in ijson.items(file, prefix, use_float=True)
+            ]
+        except ijson.JSONError:
+            # e.g. NaN literals, which only the stdlib parser accepts
+            return None
+
+        if not transactions and prefix != 'item':
+            # No (or an empty) "transactions" array; let the full parse validate the structure
+            return None
+        return transactions
+
+    def _transaction_from_json(self, tx_data: Dict[str, Any]) -> Transaction:
+        """Build a Transaction from one parsed JSON transaction object."""
+        amount = tx_data.get('amount', 0)
+        return Transaction(
+            date=tx_data.get('date', ''),
+            description=tx_data.get('description', ''),
+            amount=self._parse_amount(amount) if isinstance(amount, str) else float(amount)
+        )
+
     def generate_insights(self, transactions: List[Transaction]) -> Dict[str, Any]:
         """Generate comprehensive financial insights from categorized transactions."""
         insights = {
@@ -633,14 +1542,24 @@ Example response:
         if confidences:
             insights["summary"]["categorization_confidence"] = sum(confidences) / len(confidences)
 
+        # Aggregate into local accumulators, avoiding nested insights[...] lookups per row
+        total_income = 0
+        total_expenses = 0
+        income_breakdown = insights["income_breakdown"]
+        expense_breakdown = insights["expense_breakdown"]
+        monthly_analysis = insights["monthly_analysis"]
+        top_income: List[Tuple[float, int, Transaction]] = []
+        top_expenses: List[Tuple[float, int, Transaction]] = []
+        low_confidence_transactions = insights["low_confidence_transactions"]
+
         # Process each transaction
-        for transaction in transactions:
+        for index, transaction in enumerate(transactions):
             amount = abs(transaction.amount)
             category = transaction.category or "Uncategorized"
 
             # Track low confidence transactions
             if transaction.confidence and transaction.confidence < 0.5:
-                insights["low_confidence_transactions"].append({
+                low_confidence_transactions.append({
                     "date": transaction.date,
                     "description": transaction.description,
                     "amount": transaction.amount,
@@ -649,89 +1568,91 @@ Example response:
                 })
 
             # Monthly analysis
-            try:
-                month_year = datetime.strptime(transaction.date, '%Y-%m-%d').strftime('%Y-%m')
-            except:
-                month_year = transaction.date[:7] if len(transaction.date) >= 7 else "Unknown"
+            month_year = _date_to_month(transaction.date)
 
-            if month_year not in insights["monthly_analysis"]:
-                insights["monthly_analysis"][month_year] = {
-                    "income": 0, "expenses": 0, "net": 0
-                }
+            month = monthly_analysis.get(month_year)
+            if month is None:
+                month = monthly_analysis[month_year] = {"income": 0, "expenses": 0, "net": 0}
 
             if transaction.type == "income":
-                insights["summary"]["total_income"] += amount
-                insights["monthly_analysis"][month_year]["income"] += amount
+                total_income += amount
+                month["income"] += amount
 
                 # Income breakdown
-                if category not in insights["income_breakdown"]:
-                    insights["income_breakdown"][category] = {"amount": 0, "count": 0}
-                insights["income_breakdown"][category]["amount"] += amount
-                insights["income_breakdown"][category]["count"] += 1
+                breakdown = income_breakdown.get(category)
+                if breakdown is None:
+                    breakdown = income_breakdown[category] = {"amount": 0, "count": 0}
+                breakdown["amount"] += amount
+                breakdown["count"] += 1
 
                 # Top income
-                insights["top_income"].append({
-                    "date": transaction.date,
-                    "description": transaction.description,
-                    "amount": amount,
-                    "category": category
-                })
+                _push_top_n(top_income, (amount, -index, transaction), 10)
             else:
-                insights["summary"]["total_expenses"] += amount
-                insights["monthly_analysis"][month_year]["expenses"] += amount
+                total_expenses += amount
+                month["expenses"] += amount
 
                 # Expense breakdown
-                if category not in insights["expense_breakdown"]:
-                    insights["expense_breakdown"][category] = {"amount": 0, "count": 0}
-                insights["expense_breakdown"][category]["amount"] += amount
-                insights["expense_breakdown"][category]["count"] += 1
+                breakdown = expense_breakdown.get(category)
+                if breakdown is None:
+                    breakdown = expense_breakdown[category] = {"amount": 0, "count": 0}
+                breakdown["amount"] += amount
+                breakdown["count"] += 1
 
                 # Top expenses
-                insights["top_expenses"].append({
-                    "date": transaction.date,
-                    "description": transaction.description,
-                    "amount": amount,
-                    "category": category
-                })
+                _push_top_n(top_expenses, (amount, -index, transaction), 10)
 
-            # Update monthly net
-            insights["monthly_analysis"][month_year]["net"] = (
-                insights["monthly_analysis"][month_year]["income"] -
-                insights["monthly_analysis"][month_year]["expenses"]
-            )
+        # Monthly net, once per month rather than per transaction
+        for month in monthly_analysis.values():
+            month["net"] = month["income"] - month["expenses"]
 
         # Calculate net cash flow
-        insights["summary"]["net_cash_flow"] = (
-            insights["summary"]["total_income"] - insights["summary"]["total_expenses"]
-        )
-
-        # Sort and limit top transactions
-        insights["top_expenses"].sort(key=lambda x: x["amount"], reverse=True)
-        insights["top_expenses"] = insights["top_expenses"][:10]
-
-        insights["top_income"].sort(key=lambda x: x["amount"], reverse=True)
-        insights["top_income"] = insights["top_income"][:10]
-
-        # Generate category insights
-        total_expenses = insights["summary"]["total_expenses"]
-        for category, data in insights["expense_breakdown"].items():
-            insights["category_insights"][category] = {
-                "percentage": (data["amount"] / total_expenses * 100) if total_expenses > 0 else 0,
+        insights["summary"]["total_income"] = total_income
+        insights["summary"]["total_expenses"] = total_expenses
+        insights["summary"]["net_cash_flow"] = total_income - total_expenses
+
+        # Materialize only the top transactions that survived the bounded heaps
+        for key, heap in (("top_expenses", top_expenses), ("top_income", top_income)):
+            insights[key] = [
+                {
+                    "date": transaction.date,
+                    "description": transaction.description,
+                    "amount": abs(transaction.amount),
+                    "category": transaction.category or "Uncategorized"
+                }
+                for transaction in _ranked(heap)
+            ]
+
+        # Generate category insights from the local totals in one comprehension
+        has_expenses = total_expenses > 0
+        insights["category_insights"] = {
+            category: {
+                "percentage": (data["amount"] / total_expenses * 100) if has_expenses else 0,
                 "average_amount": data["amount"] / data["count"] if data["count"] > 0 else 0
             }
+            for category, data in expense_breakdown.items()
+        }
 
         return insights
 
+    @staticmethod
+    def _largest_categories(breakdown: Dict[str, Dict[str, Any]], limit: int = 15) -> Dict[str, Dict[str, Any]]:
+        """The `limit` categories with the largest amounts, biggest first."""
+        return dict(heapq.nlargest(limit, breakdown.items(), key=lambda item: item[1]["amount"]))
+
     async def generate_suggestions_with_llm(self, transactions: List[Transaction], insights: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate intelligent financial suggestions using LLM analysis."""
+        if not transactions:
+            # Nothing to analyze; skip the LLM round-trip (the fallback would produce no suggestions either)
+            return []
+
         if not self.openai_client:
             logger.warning("No LLM client available for suggestions generation")
             return self._generate_fallback_suggestions(transactions, insights)
         
-        # Prepare summary data for LLM analysis
+        # Prepare summary data for LLM analysis, keeping only the largest categories in the prompt
         summary = insights.get("summary", {})
-        expense_breakdown = insights.get("expense_breakdown", {})
-        income_breakdown = insights.get("income_breakdown", {})
+        expense_breakdown = self._largest_categories(insights.get("expense_breakdown", {}))
+        income_breakdown = self._largest_categories(insights.get("income_breakdown", {}))
         top_expenses = insights.get("top_expenses", [])
         low_confidence_count = insights.get("low_confidence_transactions", [])
         
@@ -754,13 +1675,13 @@ FINANCIAL OVERVIEW:
 - Low Confidence Categorizations: {len(low_confidence_count)}
 
 EXPENSE BREAKDOWN:
-{json.dumps(expense_breakdown, indent=2)}
+{json_dumps(expense_breakdown, pretty=True)}
 
 INCOME SOURCES:
-{json.dumps(income_breakdown, indent=2)}
+{json_dumps(income_breakdown, pretty=True)}
 
 TOP EXPENSES:
-{json.dumps(top_expenses[:5], indent=2)}
+{json_dumps(top_expenses[:5], pretty=True)}
 
 Provide 3-5 actionable financial suggestions. Format as JSON array with these fields:
 - id: unique identifier
@@ -773,13 +1694,22 @@ Provide 3-5 actionable financial suggestions. Format as JSON array with these fi
 All monetary amounts should be in Indian Rupees (₹). Focus on practical improvements based on the actual spending patterns shown.
 """
 
+        # The prompt captures every input the suggestions depend on, so it doubles as the cache fingerprint
+        cache_key = hashlib.blake2b(f"{self.model}\0{prompt}".encode("utf-8"), digest_size=16).hexdigest()
+        cached = self._suggestion_cache.get(cache_key)
+        if cached is not None:
+            self._suggestion_cache.move_to_end(cache_key)
+            logger.info(f"Using cached LLM suggestions ({len(cached)} suggestions)")
+            return [dict(suggestion) for suggestion in cached]
+
         try:
             logger.info("Generating LLM-based financial suggestions...")
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.openai_client.chat.completions.create(
-                    model=self.model,
-                    messages=[
+            # Shares the categorization concurrency limit so concurrent requests queue here too
+            async with self._llm_slots(), self._leased_client() as (client, model, _):
+                response = await self._call_llm(
+                    client,
+                    model,
+                    [
                         {
                             "role": "system",
                             "content": "You are a practical financial advisor. Analyze spending data and provide actionable advice. Respond only with valid JSON."
@@ -792,30 +1722,24 @@ All monetary amounts should be in Indian Rupees (₹). Focus on practical improv
                     max_tokens=1500,
                     temperature=0.7
                 )
-            )
             
             suggestions_text = response.choices[0].message.content.strip()
             
-            # Clean up response - remove any markdown formatting
-            if suggestions_text.startswith("```json"):
-                suggestions_text = suggestions_text[7:]
-            if suggestions_text.endswith("```"):
-                suggestions_text = suggestions_text[:-3]
-            suggestions_text = suggestions_text.strip()
+            # Clean up response - remove any markdown code fences
+            suggestions_text = _CODE_FENCE_RE.sub("", suggestions_text).strip()
             
             # Parse JSON response
-            suggestions = json.loads(suggestions_text)
+            suggestions = json_loads(suggestions_text)
             
-            # Validate and clean suggestions
-            validated_suggestions = []
-            for suggestion in suggestions:
-                if all(key in suggestion for key in ["id", "title", "description", "category", "impact"]):
-                    # Ensure valid category and impact values
-                    if suggestion["category"] in ["savings", "spending", "budget", "investment"] and \
-                       suggestion["impact"] in ["high", "medium", "low"]:
-                        validated_suggestions.append(suggestion)
+            # Keep only suggestions with the required keys and valid category/impact values
+            if not isinstance(suggestions, list):
+                raise ValueError(f"Expected a JSON array of suggestions, got {type(suggestions).__name__}")
+            validated_suggestions = [suggestion for suggestion in suggestions if _is_valid_suggestion(suggestion)]
             
             logger.info(f"Generated {len(validated_suggestions)} valid LLM suggestions")
+            self._suggestion_cache[cache_key] = [dict(suggestion) for suggestion in validated_suggestions]
+            if len(self._suggestion_cache) > self.SUGGESTION_CACHE_SIZE:
+                self._suggestion_cache.popitem(last=False)
             return validated_suggestions
             
         except json.JSONDecodeError as e:
@@ -828,6 +1752,8 @@ All monetary amounts should be in Indian Rupees (₹). Focus on practical improv
 
     def _generate_fallback_suggestions(self, transactions: List[Transaction], insights: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate basic fallback suggestions when LLM is unavailable."""
+        if self.openai_client is not None:
+            _note_llm_fallback("suggestions")
         suggestions = []
         
         summary = insights.get("summary", {})
@@ -846,15 +1772,16 @@ All monetary amounts should be in Indian Rupees (₹). Focus on practical improv
         
         # Basic high spending category suggestion
         if expense_breakdown:
-            top_category = max(expense_breakdown.items(), key=lambda x: x[1])
-            if top_category[1] > 0:
+            top_category, top_data = max(expense_breakdown.items(), key=lambda item: item[1]["amount"])
+            top_amount = top_data["amount"]
+            if top_amount > 0:
                 suggestions.append({
                     "id": "top-spending",
-                    "title": f"Monitor {top_category[0]} Spending",
-                    "description": f"{top_category[0]} is your highest expense category at ₹{top_category[1]:,.2f}. Consider setting a monthly budget for this category.",
+                    "title": f"Monitor {top_category} Spending",
+                    "description": f"{top_category} is your highest expense category at ₹{top_amount:,.2f}. Consider setting a monthly budget for this category.",
                     "category": "budget",
                     "impact": "medium",
-                    "estimatedSavings": round(top_category[1] * 0.1, 2)
+                    "estimatedSavings": round(top_amount * 0.1, 2)
                 })
         
         # Basic savings suggestion
@@ -879,6 +1806,9 @@ app = Server("financial-analyzer")
 # Initialize the analyzer
 analyzer = FinancialAnalyzer()
 
+# Tool results are compact JSON; set MCP_PRETTY_JSON=1 for indented output when debugging
+PRETTY_TOOL_JSON = os.getenv("MCP_PRETTY_JSON", "0").lower() in ("1", "true", "yes", "on")
+
 @app.list_tools()
 async def list_tools() -> List[Tool]:
     """List available tools."""
@@ -897,6 +1827,12 @@ async def list_tools() -> List[Tool]:
                         "type": "boolean",
                         "description": "Whether to use LLM for categorization (default: true)",
                         "default": True
+                    },
+                    "async_mode": {
+                        "type": "string",
+                        "enum": ["sync", "batch"],
+                        "description": "'batch' categorizes through OpenAI's discounted Batch API (results can take up to 24h; OpenAI endpoints only, falls back to 'sync' elsewhere)",
+                        "default": "sync"
                     }
                 },
                 "required": ["file_path"]
@@ -965,147 +1901,162 @@ async def list_tools() -> List[Tool]:
         )
     ]
 
-@app.call_tool()
-async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
-    """Handle tool calls."""
-
-    if name == "configure_llm":
-        api_key = arguments.get("api_key")
-        base_url = arguments.get("base_url", "https://openrouter.ai/api/v1")
-        model = arguments.get("model", "openai/gpt-4o-mini")
-
-        if not api_key:
-            return [TextContent(type="text", text="Error: API key is required")]
+async def _handle_configure_llm(arguments: Dict[str, Any]) -> List[TextContent]:
+    """Re-initialize the analyzer with a new LLM provider configuration."""
+    api_key = arguments.get("api_key")
+    base_url = arguments.get("base_url", "https://openrouter.ai/api/v1")
+    model = arguments.get("model", "openai/gpt-4o-mini")
+
+    if not api_key:
+        return [TextContent(type="text", text="Error: API key is required")]
+
+    try:
+        # Swap the client in place so suggestion and categorization caches survive
+        await analyzer.reconfigure(api_key=api_key, base_url=base_url, model=model)
+
+        config_info = {
+            "status": "success",
+            "message": "LLM configuration updated successfully",
+            "base_url": base_url,
+            "model": model,
+            "provider": "OpenRouter" if "openrouter.ai" in base_url else "Custom"
+        }
 
-        try:
-            # Re-initialize the analyzer with new configuration
-            global analyzer
-            analyzer = FinancialAnalyzer(api_key=api_key, base_url=base_url, model=model)
-
-            config_info = {
-                "status": "success",
-                "message": "LLM configuration updated successfully",
-                "base_url": base_url,
-                "model": model,
-                "provider": "OpenRouter" if "openrouter.ai" in base_url else "Custom"
+        return [TextContent(type="text", text=json_dumps(config_info, pretty=PRETTY_TOOL_JSON))]
+    except Exception as e:
+        return [TextContent(type="text", text=f"Error configuring LLM: {e}")]
+
+# Static payload for list_available_models, serialized once at import
+_MODELS_INFO_JSON = json_dumps({
+    "popular_openrouter_models": {
+        "cost_effective": [
+            {
+                "name": "openai/gpt-4o-mini",
+                "description": "Fast and affordable GPT-4 variant",
+                "cost": "$0.15/1M input tokens"
+            },
+            {
+                "name": "anthropic/claude-3-haiku",
+                "description": "Fast Claude model for simple tasks",
+                "cost": "$0.25/1M input tokens"
+            },
+            {
+                "name": "google/gemini-flash-1.5",
+                "description": "Google's fast model",
+                "cost": "$0.075/1M input tokens"
             }
-
-            return [TextContent(type="text", text=json.dumps(config_info, indent=2))]
-        except Exception as e:
-            return [TextContent(type="text", text=f"Error configuring LLM: {e}")]
-
-    elif name == "list_available_models":
-        models_info = {
-            "popular_openrouter_models": {
-                "cost_effective": [
-                    {
-                        "name": "openai/gpt-4o-mini",
-                        "description": "Fast and affordable GPT-4 variant",
-                        "cost": "$0.15/1M input tokens"
-                    },
-                    {
-                        "name": "anthropic/claude-3-haiku",
-                        "description": "Fast Claude model for simple tasks",
-                        "cost": "$0.25/1M input tokens"
-                    },
-                    {
-                        "name": "google/gemini-flash-1.5",
-                        "description": "Google's fast model",
-                        "cost": "$0.075/1M input tokens"
-                    }
-                ],
-                "high_performance": [
-                    {
-                        "name": "anthropic/claude-3-5-sonnet",
-                        "description": "Excellent reasoning and analysis",
-                        "cost": "$3/1M input tokens"
-                    },
-                    {
-                        "name": "openai/gpt-4-turbo",
-                        "description": "Advanced GPT-4 with better performance",
-                        "cost": "$10/1M input tokens"
-                    },
-                    {
-                        "name": "google/gemini-pro-1.5",
-                        "description": "Advanced Google model",
-                        "cost": "$1.25/1M input tokens"
-                    }
-                ]
+        ],
+        "high_performance": [
+            {
+                "name": "anthropic/claude-3-5-sonnet",
+                "description": "Excellent reasoning and analysis",
+                "cost": "$3/1M input tokens"
             },
-            "note": "Visit https://openrouter.ai/models for the complete list and current pricing"
-        }
-
-        return [TextContent(type="text", text=json.dumps(models_info, indent=2))]
-
-    elif name == "analyze_financial_file":
-        file_path = arguments.get("file_path")
-        use_llm = arguments.get("use_llm", True)
-
-        if not file_path:
-            return [TextContent(type="text", text="Error: file_path is required")]
+            {
+                "name": "openai/gpt-4-turbo",
+                "description": "Advanced GPT-4 with better performance",
+                "cost": "$10/1M input tokens"
+            },
+            {
+                "name": "google/gemini-pro-1.5",
+                "description": "Advanced Google model",
+                "cost": "$1.25/1M input tokens"
+            }
+        ]
+    },
+    "note": "Visit https://openrouter.ai/models for the complete list and current pricing"
+}, pretty=PRETTY_TOOL_JSON)
+
+async def _handle_list_available_models(arguments: Dict[str, Any]) -> List[TextContent]:
+    """List popular models available on OpenRouter."""
+    return [TextContent(type="text", text=_MODELS_INFO_JSON)]
+
+async def _handle_analyze_financial_file(arguments: Dict[str, Any]) -> List[TextContent]:
+    """Parse, categorize and summarize a CSV or JSON transaction file."""
+    file_path = arguments.get("file_path")
+    use_llm = arguments.get("use_llm", True)
+    async_mode = arguments.get("async_mode", "sync")
+
+    if not file_path:
+        return [TextContent(type="text", text="Error: file_path is required")]
+    if async_mode not in ("sync", "batch"):
+        return [TextContent(type="text", text="Error: async_mode must be 'sync' or 'batch'")]
+
+    try:
+        # Check if file exists
+        if not Path(file_path).exists():
+            return [TextContent(type="text", text=f"Error: File not found: {file_path}")]
+
+        # Parse the file
+        file_extension = Path(file_path).suffix.lower()
+        if file_extension == '.csv':
+            transactions = analyzer.parse_csv_file(file_path)
+        elif file_extension == '.json':
+            transactions = analyzer.parse_json_file(file_path)
+        else:
+            return [TextContent(type="text", text="Error: Unsupported file format. Use CSV or JSON.")]
 
-        try:
-            # Check if file exists
-            if not Path(file_path).exists():
-                return [TextContent(type="text", text=f"Error: File not found: {file_path}")]
-
-            # Parse the file
-            file_extension = Path(file_path).suffix.lower()
-            if file_extension == '.csv':
-                transactions = analyzer.parse_csv_file(file_path)
-            elif file_extension == '.json':
-                transactions = analyzer.parse_json_file(file_path)
-            else:
-                return [TextContent(type="text", text="Error: Unsupported file format. Use CSV or JSON.")]
+        # Categorize transactions
+        if use_llm:
+            transactions = await analyzer.categorize_transactions_with_llm(transactions, async_mode=async_mode)
+        else:
+            transactions = [analyzer._fallback_categorize(tx) for tx in transactions]
 
-            # Categorize transactions
-            if use_llm:
-                transactions = await analyzer.categorize_transactions_with_llm(transactions)
-            else:
-                transactions = [analyzer._fallback_categorize(tx) for tx in transactions]
+        # Generate insights in a worker thread so the stdio server keeps serving other requests
+        insights = await asyncio.get_running_loop().run_in_executor(None, analyzer.generate_insights, transactions)
 
-            # Generate insights
-            insights = analyzer.generate_insights(transactions)
+        return [TextContent(type="text", text=json_dumps(insights, pretty=PRETTY_TOOL_JSON))]
 
-            return [TextContent(type="text", text=json.dumps(insights, indent=2))]
+    except Exception as e:
+        return [TextContent(type="text", text=f"Error analyzing file: {e}")]
 
-        except Exception as e:
-            return [TextContent(type="text", text=f"Error analyzing file: {e}")]
+async def _handle_categorize_transactions(arguments: Dict[str, Any]) -> List[TextContent]:
+    """Categorize transactions passed inline as JSON."""
+    transactions_data = arguments.get("transactions", [])
+    use_llm = arguments.get("use_llm", True)
 
-    elif name == "categorize_transactions":
-        transactions_data = arguments.get("transactions", [])
-        use_llm = arguments.get("use_llm", True)
+    if not transactions_data:
+        return [TextContent(type="text", text="Error: transactions array is required")]
 
-        if not transactions_data:
-            return [TextContent(type="text", text="Error: transactions array is required")]
+    try:
+        # Convert to Transaction objects
+        transactions = []
+        for tx_data in transactions_data:
+            transaction = Transaction(
+                date=tx_data.get("date", ""),
+                description=tx_data.get("description", ""),
+                amount=float(tx_data.get("amount", 0))
+            )
+            transactions.append(transaction)
 
-        try:
-            # Convert to Transaction objects
-            transactions = []
-            for tx_data in transactions_data:
-                transaction = Transaction(
-                    date=tx_data.get("date", ""),
-                    description=tx_data.get("description", ""),
-                    amount=float(tx_data.get("amount", 0))
-                )
-                transactions.append(transaction)
+        # Categorize transactions
+        if use_llm:
+            transactions = await analyzer.categorize_transactions_with_llm(transactions)
+        else:
+            transactions = [analyzer._fallback_categorize(tx) for tx in transactions]
 
-            # Categorize transactions
-            if use_llm:
-                transactions = await analyzer.categorize_transactions_with_llm(transactions)
-            else:
-                transactions = [analyzer._fallback_categorize(tx) for tx in transactions]
+        # Convert back to dict format
+        result = [tx.to_dict() for tx in transactions]
 
-            # Convert back to dict format
-            result = [asdict(tx) for tx in transactions]
+        return [TextContent(type="text", text=json_dumps(result, pretty=PRETTY_TOOL_JSON))]
 
-            return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    except Exception as e:
+        return [TextContent(type="text", text=f"Error categorizing transactions: {e}")]
 
-        except Exception as e:
-            return [TextContent(type="text", text=f"Error categorizing transactions: {e}")]
+_TOOL_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Awaitable[List[TextContent]]]] = {
+    "configure_llm": _handle_configure_llm,
+    "list_available_models": _handle_list_available_models,
+    "analyze_financial_file": _handle_analyze_financial_file,
+    "categorize_transactions": _handle_categorize_transactions,
+}
 
-    else:
+@app.call_tool()
+async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+    """Handle tool calls."""
+    handler = _TOOL_HANDLERS.get(name)
+    if handler is None:
         return [TextContent(type="text", text=f"Unknown tool: {name}")]
+    return await handler(arguments)
 
 async def main():
     """Main entry point for the MCP server."""
@@ -166,6 +166,10 @@ function App() {
                 if (data.total_transactions && !data.batch_number) {
                   // analysis_started event
                   console.log(`📊 Analysis started: ${data.total_transactions} transactions to process`);
+                } else if (data.transactions) {
+                  // tx_complete event: show transactions as soon as they are categorized (coalesced per flush)
+                  allTransactions.push(...data.transactions);
+                  setTransactions([...allTransactions]);
                 } else if (data.batch_number) {
                   // batch_complete event
                   console.log(`✅ Batch ${data.batch_number}/${data.total_batches} complete (${data.progress_percentage.toFixed(1)}%)`);
@@ -178,9 +182,10 @@ function App() {
                     processedCount: data.total_processed
                   });
                   
-                  // Add new transactions to the list
+                  // Add new transactions to the list, replacing this batch's per-transaction rows
                   if (data.new_transactions) {
-                    allTransactions = [...allTransactions, ...data.new_transactions];
+                    const settledCount = data.total_processed - data.new_transactions.length;
+                    allTransactions = [...allTransactions.slice(0, settledCount), ...data.new_transactions];
                     setTransactions([...allTransactions]);
                   }
                   
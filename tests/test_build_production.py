@@ -0,0 +1,49 @@
+"""Tests for unpacking the prebuilt dist archive in build_production."""
+
+import io
+import tarfile
+
+import pytest
+
+from build_production import _checked_members
+
+
+def make_archive(*members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for member in members:
+            data = b"x" if member.isfile() else b""
+            member.size = len(data)
+            archive.addfile(member, io.BytesIO(data) if data else None)
+    buffer.seek(0)
+    return tarfile.open(fileobj=buffer, mode="r:gz")
+
+
+def test_accepts_files_and_directories(tmp_path):
+    directory = tarfile.TarInfo("assets")
+    directory.type = tarfile.DIRTYPE
+    archive = make_archive(tarfile.TarInfo("index.html"), directory, tarfile.TarInfo("assets/index-abcd1234.js"))
+    archive.extractall(tmp_path, members=_checked_members(archive, str(tmp_path)))
+    assert (tmp_path / "index.html").read_bytes() == b"x"
+    assert (tmp_path / "assets" / "index-abcd1234.js").is_file()
+
+
+@pytest.mark.parametrize("name", ["../escape.js", "assets/../../escape.js", "/etc/escape.js"])
+def test_rejects_members_outside_dest(tmp_path, name):
+    dest = tmp_path / "dist"
+    dest.mkdir()
+    archive = make_archive(tarfile.TarInfo(name))
+    with pytest.raises(tarfile.TarError):
+        archive.extractall(dest, members=_checked_members(archive, str(dest)))
+    assert not (tmp_path / "escape.js").exists()
+
+
+@pytest.mark.parametrize("member_type", [tarfile.SYMTYPE, tarfile.LNKTYPE])
+def test_rejects_links(tmp_path, member_type):
+    link = tarfile.TarInfo("index.html")
+    link.type = member_type
+    link.linkname = "index.html" if member_type == tarfile.LNKTYPE else "/etc/passwd"
+    archive = make_archive(link)
+    with pytest.raises(tarfile.TarError):
+        archive.extractall(tmp_path, members=_checked_members(archive, str(tmp_path)))
+    assert not (tmp_path / "index.html").exists()
@@ -0,0 +1,53 @@
+"""Tests for web_api.coalesce_tx_events, which batches per-transaction SSE events."""
+
+import asyncio
+
+from web_api import coalesce_tx_events
+
+
+def tx(batch_number, n):
+    return {"event": "tx_complete", "batch_number": batch_number, "transaction": {"id": n}}
+
+
+async def collect(events, interval):
+    return [event async for event in coalesce_tx_events(events, interval=interval)]
+
+
+def test_flushes_when_batch_changes():
+    async def events():
+        yield tx(1, 0)
+        yield tx(1, 1)
+        yield tx(2, 2)
+
+    # An interval this long never elapses, so only the batch change and end of stream flush
+    merged = asyncio.run(collect(events(), interval=60))
+    assert merged == [
+        {"event": "tx_complete", "batch_number": 1, "transactions": [{"id": 0}, {"id": 1}]},
+        {"event": "tx_complete", "batch_number": 2, "transactions": [{"id": 2}]},
+    ]
+
+
+def test_flushes_when_interval_elapses():
+    async def events():
+        yield tx(1, 0)
+        yield tx(1, 1)
+        await asyncio.sleep(0.2)
+        yield tx(1, 2)
+
+    merged = asyncio.run(collect(events(), interval=0.05))
+    assert merged == [
+        {"event": "tx_complete", "batch_number": 1, "transactions": [{"id": 0}, {"id": 1}]},
+        {"event": "tx_complete", "batch_number": 1, "transactions": [{"id": 2}]},
+    ]
+
+
+def test_other_events_flush_pending_transactions_first():
+    async def events():
+        yield tx(1, 0)
+        yield {"event": "batch_complete", "batch_number": 1}
+
+    merged = asyncio.run(collect(events(), interval=60))
+    assert merged == [
+        {"event": "tx_complete", "batch_number": 1, "transactions": [{"id": 0}]},
+        {"event": "batch_complete", "batch_number": 1},
+    ]
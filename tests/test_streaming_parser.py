@@ -0,0 +1,50 @@
+"""Tests for StreamingObjectParser, which pulls categorizations out of a streamed LLM response."""
+
+import json
+
+from finanalyser_mcp.server import StreamingObjectParser
+
+
+def feed_all(chunks):
+    parser = StreamingObjectParser()
+    objects = []
+    for chunk in chunks:
+        objects.extend(parser.feed(chunk))
+    return objects
+
+
+def test_yields_each_object_once_complete():
+    parser = StreamingObjectParser()
+    assert parser.feed('{"results": [{"id": 0, "category": "Groceries"}') == [{"id": 0, "category": "Groceries"}]
+    assert parser.feed(', {"id": 1, "category": "Salary"}]}') == [{"id": 1, "category": "Salary"}]
+
+
+def test_braces_inside_strings_are_ignored():
+    response = '{"results": [{"id": 0, "reasoning": "matched {merchant} } pattern {"}]}'
+    assert feed_all([response]) == [{"id": 0, "reasoning": "matched {merchant} } pattern {"}]
+
+
+def test_escaped_quotes_inside_strings():
+    response = '{"results": [{"id": 0, "reasoning": "said \\"hi}\\" then \\\\"}, {"id": 1}]}'
+    assert feed_all([response]) == [{"id": 0, "reasoning": 'said "hi}" then \\'}, {"id": 1}]
+
+
+def test_objects_split_across_chunks():
+    response = json.dumps({
+        "results": [
+            {"id": 0, "category": "Dining", "reasoning": "a \"quoted\" {brace}"},
+            {"id": 1, "category": "Transport", "reasoning": "back\\slash"},
+        ]
+    })
+    expected = [
+        {"id": 0, "category": "Dining", "reasoning": "a \"quoted\" {brace}"},
+        {"id": 1, "category": "Transport", "reasoning": "back\\slash"},
+    ]
+    # Every split point, including ones between a backslash and the character it escapes
+    for size in range(1, 8):
+        chunks = [response[i:i + size] for i in range(0, len(response), size)]
+        assert feed_all(chunks) == expected
+
+
+def test_objects_without_id_are_skipped():
+    assert feed_all(['{"results": [{"category": "Other"}, {"id": 2}]}']) == [{"id": 2}]
@@ -1,24 +1,159 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse
-import tempfile
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
 import os
-import json
-from typing import Dict, Any
+import re
+import hashlib
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 import asyncio
 from dotenv import load_dotenv
 
-from finanalyser_mcp.server import FinancialAnalyzer, Transaction
+from finanalyser_mcp.server import FinancialAnalyzer, Transaction, json_dumps_bytes, track_llm_fallbacks
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI(title="Financial Analyzer API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+class RawQueueHandler(QueueHandler):
+    """Queue handler that enqueues records as-is, leaving all formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() formats the message (and any traceback) on the calling thread so the
+        # record can be pickled; the listener runs in this process, so that work can move off the request path
+        return record
+
+def start_log_listener() -> QueueListener:
+    """Put the root logger's handlers behind a queue so log formatting and writes run on a background thread."""
+    root_logger = logging.getLogger()
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *root_logger.handlers, respect_handler_level=True)
+    root_logger.handlers = [RawQueueHandler(log_queue)]
+    listener.start()
+    return listener
+
+log_listener = start_log_listener()
+atexit.register(log_listener.stop)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close the shared and pooled analyzers' LLM connections on shutdown."""
+    yield
+    await analyzer.aclose()
+    for pooled_analyzer in [*request_analyzers.values(), *retired_analyzers]:
+        await pooled_analyzer.aclose()
+    request_analyzers.clear()
+    retired_analyzers.clear()
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it is installed."""
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps_bytes(content)
+
+app = FastAPI(title="Financial Analyzer API", version="1.0.0", lifespan=lifespan,
+              default_response_class=FastJSONResponse)
+
+# Vite's content-hashed build output, relative to the /assets mount: <name>-<8-character hash>.<ext>, e.g. index-BxT3c_9q.js
+HASHED_ASSET_RE = re.compile(r"[^/]+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Precompressed siblings written by build_production.py, in order of preference
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each content-coding in an Accept-Encoding header to its q-value."""
+    qualities = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Static files that prefer the .br/.gz siblings written by build_production.py."""
+
+    async def get_response(self, path: str, scope) -> Any:
+        response = await super().get_response(path, scope)
+        if response.status_code == 200 and isinstance(response, FileResponse):
+            response = await self.precompressed_response(path, scope, response)
+        
+        # Hashed assets never change under the same name; HTML must be revalidated to pick up new hashes
+        if response.status_code in (200, 304):
+            if HASHED_ASSET_RE.fullmatch(path):
+                response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            elif path.endswith(".html"):
+                response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    async def precompressed_response(self, path: str, scope, response: FileResponse) -> Any:
+        """Swap in the .br/.gz sibling of a file when the client accepts that encoding."""
+        qualities = parse_accept_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        wildcard = qualities.get("*", 0.0)
+        original = response.stat_result
+        # Highest q-value first; the stable sort keeps brotli ahead on ties. q=0 means "not acceptable".
+        ranked = sorted(PRECOMPRESSED_ENCODINGS, key=lambda item: -qualities.get(item[0], wildcard))
+        for encoding, suffix in ranked:
+            if qualities.get(encoding, wildcard) <= 0:
+                continue
+            full_path, stat_result = await run_in_threadpool(self.lookup_path, path + suffix)
+            # A sibling older than the file itself predates a rebuild (e.g. by the --watch daemon) and is stale
+            if stat_result is not None and stat_result.st_mtime >= original.st_mtime:
+                return FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=response.media_type,
+                    headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+                )
+        return response
+
+# Uploads above this size are rejected before they are parsed
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024)
+# Allowance for the multipart boundaries and headers around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_TOO_LARGE_DETAIL = f"File too large (maximum {MAX_UPLOAD_BYTES / (1024 * 1024):g} MB)"
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject oversized analysis uploads from Content-Length before the body is spooled to disk."""
+    if request.url.path.startswith("/api/analyze"):
+        content_length = request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+            return JSONResponse(status_code=413, content={"detail": UPLOAD_TOO_LARGE_DETAIL})
+    return await call_next(request)
+
+ALLOWED_UPLOAD_EXTENSIONS = frozenset((".csv", ".json"))
+
+def validate_upload(file: UploadFile) -> str:
+    """Reject unsupported file types and uploads over MAX_UPLOAD_BYTES, returning the lowercased extension."""
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in ALLOWED_UPLOAD_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Only CSV and JSON files are supported")
+    # Chunked requests carry no Content-Length, so check the spooled size too
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=UPLOAD_TOO_LARGE_DETAIL)
+    return extension
 
-# Enable CORS for frontend development
-app.add_middleware(
-    CORSMiddleware,
 # Enable CORS for frontend development or production
 cors_origins = os.getenv("CORS_ALLOW_ORIGINS", "http://localhost:3000")
 allow_origins = [origin.strip() for origin in cors_origins.split(",") if origin.strip()]
@@ -30,16 +165,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# Environment configuration, read once at startup
+HAS_OPENROUTER_KEY = bool(os.getenv('OPENROUTER_API_KEY'))
+HAS_OPENAI_KEY = bool(os.getenv('OPENAI_API_KEY'))
+DEFAULT_MODEL_FROM_ENV = bool(os.getenv('DEFAULT_MODEL'))
+BASE_URL_FROM_ENV = bool(os.getenv('BASE_URL'))
+DEFAULT_MODEL = os.getenv('DEFAULT_MODEL') or 'google/gemini-flash-1.5'
+BASE_URL = os.getenv('BASE_URL') or 'https://openrouter.ai/api/v1'
+ENVIRONMENT_STATUS = {
+    "default_model": DEFAULT_MODEL,
+    "base_url": BASE_URL,
+    "default_model_from_env": DEFAULT_MODEL_FROM_ENV,
+    "base_url_from_env": BASE_URL_FROM_ENV
+}
+
 # Check environment variables at startup
 print("🌍 Environment Configuration:")
 print("API Keys:")
-print(f"  - OPENROUTER_API_KEY: {'Set' if os.getenv('OPENROUTER_API_KEY') else 'Not set'}")
-print(f"  - OPENAI_API_KEY: {'Set' if os.getenv('OPENAI_API_KEY') else 'Not set'}")
+print(f"  - OPENROUTER_API_KEY: {'Set' if HAS_OPENROUTER_KEY else 'Not set'}")
+print(f"  - OPENAI_API_KEY: {'Set' if HAS_OPENAI_KEY else 'Not set'}")
 print("Model Configuration:")
-print(f"  - DEFAULT_MODEL: {os.getenv('DEFAULT_MODEL', 'google/gemini-flash-1.5 (default)')}")
-print(f"  - BASE_URL: {os.getenv('BASE_URL', 'https://openrouter.ai/api/v1 (default)')}")
+print(f"  - DEFAULT_MODEL: {DEFAULT_MODEL}{'' if DEFAULT_MODEL_FROM_ENV else ' (default)'}")
+print(f"  - BASE_URL: {BASE_URL}{'' if BASE_URL_FROM_ENV else ' (default)'}")
 
-if not os.getenv('OPENROUTER_API_KEY') and not os.getenv('OPENAI_API_KEY'):
+if not HAS_OPENROUTER_KEY and not HAS_OPENAI_KEY:
     print()
     print("⚠️  No API keys found!")
     print("📝 To set up your configuration, choose one of these options:")
@@ -55,209 +207,395 @@ print("🔧 Initializing default analyzer...")
 analyzer = FinancialAnalyzer()
 print("✅ Default analyzer initialized")
 
+# Analyzers for caller-supplied API keys, reused so repeat callers keep their connection pool
+ANALYZER_POOL_SIZE = 32
+request_analyzers: "OrderedDict[Tuple[str, str], FinancialAnalyzer]" = OrderedDict()
+# Requests currently using each pooled analyzer, and evicted analyzers waiting for theirs to finish
+analyzer_leases: "Dict[FinancialAnalyzer, int]" = {}
+retired_analyzers: "Set[FinancialAnalyzer]" = set()
+
+async def acquire_request_analyzer(api_key: str, model_name: str) -> FinancialAnalyzer:
+    """Lease the pooled analyzer for this API key and model, creating it on first use."""
+    key = (api_key, model_name)
+    current_analyzer = request_analyzers.get(key)
+    if current_analyzer is not None:
+        request_analyzers.move_to_end(key)
+    else:
+        logger.info("🔑 Creating new analyzer with provided API key and model: %s", model_name)
+        current_analyzer = FinancialAnalyzer(api_key=api_key, model=model_name)
+        request_analyzers[key] = current_analyzer
+    analyzer_leases[current_analyzer] = analyzer_leases.get(current_analyzer, 0) + 1
+    
+    if len(request_analyzers) > ANALYZER_POOL_SIZE:
+        _, evicted_analyzer = request_analyzers.popitem(last=False)
+        # Close the evicted analyzer's connections once no request is using it
+        if evicted_analyzer in analyzer_leases:
+            retired_analyzers.add(evicted_analyzer)
+        else:
+            await evicted_analyzer.aclose()
+    return current_analyzer
+
+async def release_request_analyzer(current_analyzer: FinancialAnalyzer) -> None:
+    """Return a leased analyzer, closing it if it was evicted while in use."""
+    leases = analyzer_leases.get(current_analyzer)
+    if leases is None:
+        return
+    if leases > 1:
+        analyzer_leases[current_analyzer] = leases - 1
+        return
+    del analyzer_leases[current_analyzer]
+    if current_analyzer in retired_analyzers:
+        retired_analyzers.discard(current_analyzer)
+        await current_analyzer.aclose()
+
+def sse_event(event_type: str, data: Any) -> bytes:
+    """Encode one Server-Sent Events frame with a JSON payload."""
+    return b"event: %s\ndata: %s\n\n" % (event_type.encode(), json_dumps_bytes(data))
+
+# Per-transaction events are merged into one SSE frame at most this often (seconds)
+TX_EVENT_FLUSH_INTERVAL = 0.25
+
+async def coalesce_tx_events(events: AsyncIterator[Dict[str, Any]], interval: float = TX_EVENT_FLUSH_INTERVAL):
+    """Merge runs of tx_complete events into one event per batch, flushed every `interval` seconds."""
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    pending: List[Dict[str, Any]] = []
+    pending_batch = None
+    deadline = None
+    next_event = None
+
+    def flush() -> Dict[str, Any]:
+        nonlocal pending, deadline
+        merged = {"event": "tx_complete", "batch_number": pending_batch, "transactions": pending}
+        pending, deadline = [], None
+        return merged
+
+    try:
+        while True:
+            if next_event is None:
+                next_event = asyncio.ensure_future(iterator.__anext__())
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            done, _ = await asyncio.wait({next_event}, timeout=timeout)
+            if not done:
+                # Interval elapsed while waiting for more transactions
+                yield flush()
+                continue
+
+            try:
+                event = next_event.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                next_event = None
+
+            if event.get("event") == "tx_complete":
+                if pending and event["batch_number"] != pending_batch:
+                    yield flush()
+                pending.append(event["transaction"])
+                pending_batch = event["batch_number"]
+                if deadline is None:
+                    deadline = loop.time() + interval
+                continue
+
+            if pending:
+                yield flush()
+            yield event
+
+        if pending:
+            yield flush()
+    finally:
+        if next_event is not None:
+            next_event.cancel()
+
+# Completed analyses kept for re-uploads of the same file, bounded by their encoded size
+# (least recently used evicted first)
+ANALYSIS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+analysis_cache: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+analysis_cache_bytes = 0
+
+def upload_digest(file: UploadFile) -> str:
+    """blake2b digest of the upload's bytes, leaving the file positioned at the start."""
+    digest = hashlib.blake2b(digest_size=16)
+    upload = file.file
+    upload.seek(0)
+    for chunk in iter(lambda: upload.read(1 << 20), b""):
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+async def analysis_cache_key(kind: str, current_analyzer: FinancialAnalyzer, file: UploadFile, extension: str) -> Optional[str]:
+    """Key an analysis on the upload's content hash and LLM endpoint, or None when no LLM calls would be saved."""
+    client = current_analyzer.openai_client
+    if client is None:
+        return None
+    
+    # Different providers or accounts can serve the same model name with different results
+    key_fingerprint = hashlib.blake2b(client.api_key.encode("utf-8"), digest_size=8).hexdigest()
+    digest = await run_in_threadpool(upload_digest, file)
+    return f"{kind}:{digest}{extension}:{current_analyzer.model}@{current_analyzer.base_url}#{key_fingerprint}"
+
+def analysis_cache_get(key: Optional[str]) -> Any:
+    """Return a cached analysis and mark it recently used."""
+    if key is None or key not in analysis_cache:
+        return None
+    analysis_cache.move_to_end(key)
+    return analysis_cache[key][0]
+
+def analysis_cache_put(key: Optional[str], value: Any) -> None:
+    """Store a completed analysis (body bytes or a list of SSE frames), evicting least recently used entries."""
+    global analysis_cache_bytes
+    if key is None:
+        return
+    size = len(value) if isinstance(value, bytes) else sum(len(frame) for frame in value)
+    if size > ANALYSIS_CACHE_MAX_BYTES:
+        return
+    if key in analysis_cache:
+        analysis_cache_bytes -= analysis_cache.pop(key)[1]
+    analysis_cache[key] = (value, size)
+    analysis_cache_bytes += size
+    while analysis_cache_bytes > ANALYSIS_CACHE_MAX_BYTES:
+        analysis_cache_bytes -= analysis_cache.popitem(last=False)[1][1]
+
+def summarize_transactions(transactions: List[Transaction]) -> Dict[str, Any]:
+    """Totals, categories and confidence counts for the response summary, in one pass."""
+    total_income = 0
+    total_expenses = 0
+    categories = set()
+    high_confidence_count = 0
+    low_confidence_count = 0
+    for t in transactions:
+        if t.type == "income":
+            total_income += t.amount
+        elif t.type == "expense":
+            total_expenses += t.amount
+        categories.add(t.category)
+        confidence = t.confidence
+        if confidence is not None:
+            if confidence > 0.8:
+                high_confidence_count += 1
+            elif confidence < 0.6:
+                low_confidence_count += 1
+
+    return {
+        "total_transactions": len(transactions),
+        "total_income": total_income,
+        "total_expenses": abs(total_expenses),
+        "categories": list(categories),
+        "high_confidence_count": high_confidence_count,
+        "low_confidence_count": low_confidence_count
+    }
+
+def parse_upload(current_analyzer: FinancialAnalyzer, file: UploadFile, extension: str) -> List[Transaction]:
+    """Parse an uploaded CSV/JSON file straight from its spooled upload buffer."""
+    if extension == ".csv":
+        return current_analyzer.parse_csv_stream(file.file)
+    return current_analyzer.parse_json_stream(file.file)
+
 @app.post("/api/analyze")
 async def analyze_file(
     file: UploadFile = File(...),
     llm_provider: str = "openrouter",
-    model_name: str = os.getenv("DEFAULT_MODEL", "google/gemini-flash-1.5"),
+    model_name: str = DEFAULT_MODEL,
     api_key: str = None
 ):
     """Analyze uploaded financial file and return categorized transactions with insights."""
     
-    print(f"📁 Analyzing file: {file.filename}")
-    print(f"🔧 Parameters: provider={llm_provider}, model={model_name}, api_key={'provided' if api_key else 'not provided'}")
-    
-    if not file.filename.endswith(('.csv', '.json')):
-        raise HTTPException(status_code=400, detail="Only CSV and JSON files are supported")
+    logger.info("📁 Analyzing file: %s", file.filename)
+    logger.info("🔧 Parameters: provider=%s, model=%s, api_key=%s", llm_provider, model_name, 'provided' if api_key else 'not provided')
     
-    # Create temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-        content = await file.read()
-        temp_file.write(content)
-        temp_file_path = temp_file.name
+    extension = validate_upload(file)
     
+    current_analyzer = analyzer
     try:
-        # Create analyzer with API key if provided, otherwise use default
+        # Use the pooled analyzer for the provided API key, otherwise the default
         if api_key:
-            print(f"🔑 Creating new analyzer with provided API key and model: {model_name}")
-            current_analyzer = FinancialAnalyzer(api_key=api_key, model=model_name)
-        else:
-            print(f"🔄 Using default analyzer")
-            current_analyzer = analyzer
-        
-        # Parse the file and categorize transactions
-        if temp_file_path.endswith('.csv'):
-            transactions = current_analyzer.parse_csv_file(temp_file_path)
+            current_analyzer = await acquire_request_analyzer(api_key, model_name)
         else:
-            transactions = current_analyzer.parse_json_file(temp_file_path)
+            logger.info("🔄 Using default analyzer")
         
-        # Categorize transactions with LLM
-        transactions = await current_analyzer.categorize_transactions_with_llm(transactions)
+        # Identical re-uploads skip parsing and the LLM entirely
+        cache_key = await analysis_cache_key("analyze", current_analyzer, file, extension)
+        cached_body = analysis_cache_get(cache_key)
+        if cached_body is not None:
+            logger.info("♻️  Returning cached analysis for %s", file.filename)
+            return Response(cached_body, media_type="application/json")
         
-        # Generate insights
-        insights = current_analyzer.generate_insights(transactions)
+        # Parse the file off the event loop, then categorize transactions
+        transactions = await run_in_threadpool(parse_upload, current_analyzer, file, extension)
         
-        # Generate LLM-based suggestions
-        suggestions = await current_analyzer.generate_suggestions_with_llm(transactions, insights)
+        with track_llm_fallbacks() as llm_fallbacks:
+            # Categorize transactions with LLM
+            transactions = await current_analyzer.categorize_transactions_with_llm(transactions)
+            
+            # Generate insights off the event loop
+            insights = await run_in_threadpool(current_analyzer.generate_insights, transactions)
+            
+            # Generate LLM-based suggestions while the summary is computed
+            suggestions, summary = await asyncio.gather(
+                current_analyzer.generate_suggestions_with_llm(transactions, insights),
+                run_in_threadpool(summarize_transactions, transactions),
+            )
         
         # Format response for frontend
         response = {
-            "transactions": [
-                {
-                    "date": t.date,
-                    "description": t.description,
-                    "amount": t.amount,
-                    "category": t.category,
-                    "type": t.type,
-                    "confidence": t.confidence
-                }
-                for t in transactions
-            ],
+            "transactions": [t.to_dict() for t in transactions],
             "insights": insights,
             "suggestions": suggestions,
-            "summary": {
-                "total_transactions": len(transactions),
-                "total_income": sum(t.amount for t in transactions if t.type == "income"),
-                "total_expenses": abs(sum(t.amount for t in transactions if t.type == "expense")),
-                "categories": list(set(t.category for t in transactions)),
-                "high_confidence_count": len([t for t in transactions if t.confidence > 0.8]),
-                "low_confidence_count": len([t for t in transactions if t.confidence < 0.6])
-            }
+            "summary": summary
         }
         
-        return response
+        # Render straight to bytes, skipping FastAPI's jsonable_encoder pass over every transaction
+        body = json_dumps_bytes(response)
+        # A run that fell back after an LLM failure must not be replayed as a successful analysis
+        if not llm_fallbacks:
+            analysis_cache_put(cache_key, body)
+        return Response(body, media_type="application/json")
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
-    
     finally:
-        # Clean up temporary file
-        if temp_file_path is not None and os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
+        await release_request_analyzer(current_analyzer)
 
 @app.post("/api/analyze/stream")
 async def analyze_file_stream(
     file: UploadFile = File(...),
     llm_provider: str = "openrouter",
-    model_name: str = os.getenv("DEFAULT_MODEL", "google/gemini-flash-1.5"),
+    model_name: str = DEFAULT_MODEL,
     api_key: str = None
 ):
     """Stream analysis results in real-time using Server-Sent Events."""
     
-    print(f"📁 Starting streaming analysis for: {file.filename}")
-    print(f"🔧 Stream parameters: provider={llm_provider}, model={model_name}")
+    logger.info("📁 Starting streaming analysis for: %s", file.filename)
+    logger.info("🔧 Stream parameters: provider=%s, model=%s", llm_provider, model_name)
     
-    if not file.filename.endswith(('.csv', '.json')):
-        raise HTTPException(status_code=400, detail="Only CSV and JSON files are supported")
+    extension = validate_upload(file)
     
-    # Create temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-        content = await file.read()
-        temp_file.write(content)
-        temp_file_path = temp_file.name
+    # Read the upload before returning the response: FastAPI 0.106-0.117 closes UploadFile
+    # before the streaming body runs. Failures are still reported as an SSE error event.
+    cached_frames = None
+    setup_error = None
+    current_analyzer = analyzer
+    try:
+        # Use the pooled analyzer for the provided API key, otherwise the default; the lease ends with the stream
+        if api_key:
+            current_analyzer = await acquire_request_analyzer(api_key, model_name)
+        else:
+            logger.info("🔄 Using default analyzer for streaming")
+        
+        # Replay the recorded events for an identical re-upload
+        cache_key = await analysis_cache_key("stream", current_analyzer, file, extension)
+        cached_frames = analysis_cache_get(cache_key)
+        if cached_frames is None:
+            # Parse the file off the event loop
+            transactions = await run_in_threadpool(parse_upload, current_analyzer, file, extension)
+    except Exception as e:
+        setup_error = e
     
     async def stream_analysis():
         try:
-            # Create analyzer with API key if provided, otherwise use default
-            if api_key:
-                print(f"🔑 Creating streaming analyzer with provided API key")
-                current_analyzer = FinancialAnalyzer(api_key=api_key, model=model_name)
-            else:
-                print(f"🔄 Using default analyzer for streaming")
-                current_analyzer = analyzer
-            
-            # Parse the file first
-            if temp_file_path.endswith('.csv'):
-                transactions = current_analyzer.parse_csv_file(temp_file_path)
-            else:
-                transactions = current_analyzer.parse_json_file(temp_file_path)
-            
-            print(f"📊 Parsed {len(transactions)} transactions, starting stream...")
-            
-            # Send initial event with file info
-            initial_data = {
-                'total_transactions': len(transactions),
-                'filename': file.filename
-            }
-            yield f"event: analysis_started\ndata: {json.dumps(initial_data)}\n\n"
-            
-            # Stream categorized transactions
-            async for batch_result in current_analyzer.categorize_transactions_streaming(transactions):
-                event_type = batch_result.get("event", "batch_complete")
+            async for frame in analysis_frames():
+                yield frame
+        finally:
+            await release_request_analyzer(current_analyzer)
+    
+    async def analysis_frames():
+        if setup_error is not None:
+            logger.error("❌ Streaming analysis error: %s", setup_error)
+            yield sse_event("error", {'error': str(setup_error)})
+            return
+        
+        if cached_frames is not None:
+            logger.info("♻️  Replaying cached analysis for %s", file.filename)
+            for frame in cached_frames:
+                yield frame
+            return
+        
+        try:
+            with track_llm_fallbacks() as llm_fallbacks:
+                logger.info("📊 Parsed %d transactions, starting stream...", len(transactions))
+                
+                # Send initial event with file info
+                initial_data = {
+                    'total_transactions': len(transactions),
+                    'filename': file.filename
+                }
+                frames = [sse_event("analysis_started", initial_data)]
+                yield frames[-1]
                 
-                # Remove the 'event' key from data since we're using it in the SSE format
-                data = {k: v for k, v in batch_result.items() if k != "event"}
+                # Stream categorized transactions
+                batch_results = coalesce_tx_events(current_analyzer.categorize_transactions_streaming(transactions))
+                async for batch_result in batch_results:
+                    # Move the 'event' key out of the data since we're using it in the SSE format
+                    event_type = batch_result.pop("event", "batch_complete")
+                
+                    frames.append(sse_event(event_type, batch_result))
+                    yield frames[-1]
+                
+                # Generate final suggestions with LLM
+                logger.info("🔮 Generating AI-powered suggestions...")
+                final_insights = await run_in_threadpool(current_analyzer.generate_insights, transactions)
+                suggestions = await current_analyzer.generate_suggestions_with_llm(transactions, final_insights)
+                
+                # Send suggestions event
+                suggestions_data = {
+                    'suggestions': suggestions,
+                    'suggestions_count': len(suggestions)
+                }
+                frames.append(sse_event("suggestions_generated", suggestions_data))
+                yield frames[-1]
+                
+                # Send completion event
+                logger.info("✅ Streaming analysis completed for %s", file.filename)
+                frames.append(sse_event("analysis_complete", {'message': 'Analysis completed successfully'}))
+                # A run that fell back after an LLM failure must not be replayed as a successful analysis
+                if not llm_fallbacks:
+                    analysis_cache_put(cache_key, frames)
+                yield frames[-1]
                 
-                yield f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
-            
-            # Generate final suggestions with LLM
-            print("🔮 Generating AI-powered suggestions...")
-            final_insights = current_analyzer.generate_insights(transactions)
-            suggestions = await current_analyzer.generate_suggestions_with_llm(transactions, final_insights)
-            
-            # Send suggestions event
-            suggestions_data = {
-                'suggestions': suggestions,
-                'suggestions_count': len(suggestions)
-            }
-            yield f"event: suggestions_generated\ndata: {json.dumps(suggestions_data)}\n\n"
-            
-            # Send completion event
-            print(f"✅ Streaming analysis completed for {file.filename}")
-            yield f"event: analysis_complete\ndata: {json.dumps({'message': 'Analysis completed successfully'})}\n\n"
-            
         except Exception as e:
-            print(f"❌ Streaming analysis error: {e}")
-            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
-        
-        finally:
-            # Clean up temporary file
-            if temp_file_path is not None and os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+            logger.error("❌ Streaming analysis error: %s", e)
+            yield sse_event("error", {'error': str(e)})
     
     return StreamingResponse(
         stream_analysis(),
-        media_type="text/plain",
+        media_type="text/event-stream",
         headers={
-            "Content-Type": "text/event-stream",
+            # Compressing would buffer events; older Starlette gzips event streams unless told otherwise
+            "Content-Encoding": "identity",
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
+            # Stop nginx-style reverse proxies from buffering the stream
+            "X-Accel-Buffering": "no",
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Headers": "*",
         }
     )
 
+# Model list served by /api/models, serialized once at import
+AVAILABLE_MODELS_BODY = json_dumps_bytes({"models": [
+    {"name": "openai/gpt-4o-mini", "provider": "openrouter", "cost": "$0.15/1M tokens"},
+    {"name": "anthropic/claude-3-haiku", "provider": "openrouter", "cost": "$0.25/1M tokens"},
+    {"name": "google/gemini-flash-1.5", "provider": "openrouter", "cost": "$0.075/1M tokens"},
+    {"name": "anthropic/claude-3-5-sonnet", "provider": "openrouter", "cost": "$3/1M tokens"},
+    {"name": "openai/gpt-4-turbo", "provider": "openrouter", "cost": "$10/1M tokens"}
+]})
+
 @app.get("/api/models")
 async def get_available_models():
     """Get list of available models with pricing information."""
     # Return a simplified list of popular models since we don't have the MCP method
-    models = [
-        {"name": "openai/gpt-4o-mini", "provider": "openrouter", "cost": "$0.15/1M tokens"},
-        {"name": "anthropic/claude-3-haiku", "provider": "openrouter", "cost": "$0.25/1M tokens"},
-        {"name": "google/gemini-flash-1.5", "provider": "openrouter", "cost": "$0.075/1M tokens"},
-        {"name": "anthropic/claude-3-5-sonnet", "provider": "openrouter", "cost": "$3/1M tokens"},
-        {"name": "openai/gpt-4-turbo", "provider": "openrouter", "cost": "$10/1M tokens"}
-    ]
-    return {"models": models}
+    return Response(AVAILABLE_MODELS_BODY, media_type="application/json")
 
 @app.get("/api/config/status")
 async def get_config_status():
     """Get current configuration status."""
-    has_openrouter = bool(os.getenv('OPENROUTER_API_KEY'))
-    has_openai = bool(os.getenv('OPENAI_API_KEY'))
-    
     return {
-        "openrouter_configured": has_openrouter,
-        "openai_configured": has_openai,
+        "openrouter_configured": HAS_OPENROUTER_KEY,
+        "openai_configured": HAS_OPENAI_KEY,
         "llm_available": analyzer.openai_client is not None,
         "current_model": analyzer.model if analyzer.openai_client else None,
-        "current_provider": "openrouter" if has_openrouter else "openai" if has_openai else None,
-        "environment": {
-            "default_model": os.getenv('DEFAULT_MODEL', 'google/gemini-flash-1.5'),
-            "base_url": os.getenv('BASE_URL', 'https://openrouter.ai/api/v1'),
-            "default_model_from_env": bool(os.getenv('DEFAULT_MODEL')),
-            "base_url_from_env": bool(os.getenv('BASE_URL'))
-        }
+        "current_provider": "openrouter" if HAS_OPENROUTER_KEY else "openai" if HAS_OPENAI_KEY else None,
+        "environment": ENVIRONMENT_STATUS
     }
 
 @app.post("/api/configure")
@@ -268,10 +606,10 @@ async def configure_llm_endpoint(
 ):
     """Configure LLM provider and model."""
     try:
-        # Create a new analyzer with the provided configuration
+        # Repoint the shared analyzer in place so caches stay warm. LLM calls already running finish on the
+        # old client (closed after the last one); calls made after this, even within a running analysis, use the new one
         base_url = "https://openrouter.ai/api/v1" if llm_provider == "openrouter" else "https://api.openai.com/v1"
-        global analyzer
-        analyzer = FinancialAnalyzer(api_key=api_key, base_url=base_url, model=model_name)
+        await analyzer.reconfigure(api_key=api_key, base_url=base_url, model=model_name)
         
         return {
             "message": "LLM configured successfully", 
@@ -282,16 +620,24 @@ async def configure_llm_endpoint(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Configuration failed: {str(e)}")
 
-# Serve React static files
+# Serve React static files; Vite builds with base "/", so the page requests its bundles from /assets/
 try:
-    app.mount("/static", StaticFiles(directory="frontend/dist"), name="static")
+    app.mount("/assets", PrecompressedStaticFiles(directory="frontend/dist/assets"), name="assets")
+    
+    # Files copied from frontend/public (e.g. /vite.svg) sit next to index.html
+    DIST_ROOT_FILES = frozenset(
+        entry.name for entry in os.scandir("frontend/dist")
+        if entry.is_file() and not entry.name.startswith(".") and not entry.name.endswith((".gz", ".br"))
+    )
     
     @app.get("/{full_path:path}")
     async def serve_react_app(full_path: str):
         """Serve React app for all non-API routes."""
         if full_path.startswith("api/"):
             raise HTTPException(status_code=404, detail="Not found")
-        return FileResponse("frontend/dist/index.html")
+        if full_path in DIST_ROOT_FILES and full_path != "index.html":
+            return FileResponse(os.path.join("frontend/dist", full_path))
+        return FileResponse("frontend/dist/index.html", headers={"Cache-Control": "no-cache"})
 except Exception:
     # Frontend not built yet
     pass